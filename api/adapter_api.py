@@ -1,5 +1,11 @@
+import time
+from decimal import Decimal, ROUND_DOWN
+from concurrent.futures import ThreadPoolExecutor
 from api.bitget.bitget_api import BitgetApi
 # 如果将来要接 OKX 或 Binance，可在这里 import 相应类
+from log.logger import get_logger
+
+logger = get_logger("api")
 
 class APIAdapter:
     """
@@ -8,7 +14,8 @@ class APIAdapter:
     - 内部根据交易所选择具体 API 实现
     """
 
-    def __init__(self, exchange_name, test_flag, api_key, api_secret, passphrase, base_url=None):
+    def __init__(self, exchange_name, test_flag, api_key, api_secret, passphrase, base_url=None,
+                 pool_size=10, timeouts=None, max_workers=4, size_mode="local", contract_refresh=3600):
         self.exchange_name = exchange_name.lower()
         self.api_key = api_key
         self.api_secret = api_secret
@@ -16,10 +23,54 @@ class APIAdapter:
 
         # 根据交易所选择具体 API 类
         if self.exchange_name == "bitget":
-            self.api = BitgetApi(test_flag, api_key, api_secret, passphrase, base_url or "https://api.bitget.com")
+            self.api = BitgetApi(test_flag, api_key, api_secret, passphrase, base_url or "https://api.bitget.com",
+                                 pool_size=pool_size, timeouts=timeouts)
         else:
             raise ValueError(f"暂不支持交易所: {exchange_name}")
 
+        # 并发发起互不依赖的 REST 请求
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api")
+
+        # 合约规格缓存：productType -> {symbol: spec}
+        # size_mode: "local" 本地计算张数；"remote" 调用 open-count 接口；"check" 两者都算并对比
+        if size_mode not in ("local", "remote", "check"):
+            raise ValueError(f"未知的 size_mode: {size_mode}")
+        self.size_mode = size_mode
+        self.contract_refresh = contract_refresh
+        self._contracts = {}
+        self._contracts_loaded_at = {}
+        self._contracts_refreshing = set()
+
+        # 私有 WS 维护的账户状态（core.context.AccountContext），同步后余额直接从内存读取
+        self.account_context = None
+
+    # -----------------------------
+    # 连接管理
+    # -----------------------------
+    def warmup(self, connections=2):
+        """启动时预热 HTTP 连接池"""
+        return self.api.warmup(connections)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.api.close()
+
+    # -----------------------------
+    # 并发请求
+    # -----------------------------
+    def submit(self, fn, *args, **kwargs):
+        """在线程池中执行一个接口调用，返回 Future"""
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def gather(self, *calls):
+        """
+        同时发出多个互不依赖的请求并一起等待，总耗时约等于最慢的那个
+        :param calls: (fn, *args) 元组
+        :return: 与 calls 顺序一致的结果列表
+        """
+        futures = [self._executor.submit(call[0], *call[1:]) for call in calls]
+        return [future.result() for future in futures]
+
     # -----------------------------
     # K线接口
     # -----------------------------
@@ -30,7 +81,15 @@ class APIAdapter:
                     endTime: int = None,
                     kLineType: str = None,
                     limit: int = None):
-        return self.api.get_kline(symbol, productType, granularity, startTime, endTime, kLineType, limit)
+        return self.api.get_candles(symbol, productType, granularity, startTime, endTime, kLineType, limit)
+
+    def get_history_kline(self, symbol: str,
+                          productType: str,
+                          granularity: str,
+                          startTime: int = None,
+                          endTime: int = None,
+                          limit: int = None):
+        return self.api.get_history_candles(symbol, productType, granularity, startTime, endTime, limit)
 
     # -----------------------------
     # 下单接口
@@ -38,6 +97,9 @@ class APIAdapter:
     def place_order(self, symbol, productType, marginMode, marginCoin, price, size, side, order_type, time_in_force="GTC", reduce_only=None, client_oid=None, tradeSide=None):
         return self.api.place_order(symbol, productType, marginMode, marginCoin, price, size, side, order_type, time_in_force, reduce_only, client_oid, tradeSide)
 
+    def get_order_detail(self, symbol, productType, orderId=None, clientOid=None):
+        return self.api.get_order_detail(symbol, productType, orderId, clientOid)
+
     # -----------------------------
     # 平仓接口
     # -----------------------------
@@ -68,10 +130,20 @@ class APIAdapter:
     # 单个合约持仓信息
     def get_single_position(self, symbol, productType, marginCoin):
         return self.api.get_single_position(symbol, productType, marginCoin)
-    
+
+    # 全部持仓
+    def get_all_positions(self, productType="USDT-FUTURES", marginCoin="USDT"):
+        return self.api.get_all_positions(productType, marginCoin)
+
+    # 当前未成交委托
+    def get_pending_orders(self, productType="USDT-FUTURES", symbol=None):
+        return self.api.get_pending_orders(productType, symbol)
 
     def get_available(self, productType="USDT-FUTURES", marginCoin="USDT"):
-        # 返回账户某个币还有多少个
+        # 返回账户某个币还有多少个；账户状态已由私有 WS 同步时不再请求
+        context = self.account_context
+        if context is not None and context.synced:
+            return context.available(marginCoin)
         account = self.get_account(productType)  
         for acc in account.get("data", []):
             if acc["marginCoin"] == marginCoin:
@@ -79,6 +151,104 @@ class APIAdapter:
         return available
     
     def get_open_size(self, symbol="BTCUSDT", productType="USDT-FUTURES", marginCoin="USDT", openAmount=None, openPrice=None, leverage=None):
-        # 计算合约可开张数
+        # 计算合约可开张数（按 size_mode 本地计算 / 调用接口 / 交叉校验）
+        if self.size_mode == "remote":
+            return self.get_open_size_remote(symbol, productType, marginCoin, openAmount, openPrice, leverage)
+        size = self.calc_open_size(symbol, productType, openAmount, openPrice, leverage)
+        if self.size_mode == "check":
+            remote = self.get_open_size_remote(symbol, productType, marginCoin, openAmount, openPrice, leverage)
+            if Decimal(remote) != Decimal(size):
+                logger.warning("⚠️ 本地张数与接口张数不一致", symbol=symbol, local=size, remote=remote,
+                               amount=openAmount, price=openPrice, leverage=leverage)
+        return size
+
+    def get_open_size_remote(self, symbol="BTCUSDT", productType="USDT-FUTURES", marginCoin="USDT", openAmount=None, openPrice=None, leverage=None):
+        # 调用 open-count 接口计算合约可开张数
         size = self.api.get_open_size(symbol, productType, marginCoin, openAmount, openPrice, leverage)  # 返回所有账户记录
-        return size["data"]["size"]
\ No newline at end of file
+        return size["data"]["size"]
+
+    # -----------------------------
+    # 合约规格（本地缓存，定期刷新）
+    # -----------------------------
+    def load_contracts(self, productType="USDT-FUTURES"):
+        """从公共 contracts 接口加载某类合约的全部规格"""
+        resp = self.api.get_contracts(productType)
+        contracts = {}
+        for item in resp.get("data", []):
+            contracts[item["symbol"]] = {
+                "sizeMultiplier": Decimal(item["sizeMultiplier"]),
+                "minTradeNum": Decimal(item["minTradeNum"]),
+                "pricePlace": int(item["pricePlace"]),
+                "volumePlace": int(item["volumePlace"]),
+            }
+        self._contracts[productType] = contracts
+        self._contracts_loaded_at[productType] = time.monotonic()
+        return contracts
+
+    def _refresh_contracts(self, productType):
+        try:
+            self.load_contracts(productType)
+        except Exception as e:
+            logger.warning("合约规格刷新失败", error=e)
+        finally:
+            self._contracts_refreshing.discard(productType)
+
+    def get_contract(self, symbol, productType="USDT-FUTURES"):
+        """
+        读取合约规格
+        - 首次使用时同步加载
+        - 过期后在后台线程刷新，当前调用仍使用缓存，不阻塞下单路径
+        """
+        contracts = self._contracts.get(productType)
+        if contracts is None:
+            contracts = self.load_contracts(productType)
+        elif (time.monotonic() - self._contracts_loaded_at[productType] > self.contract_refresh
+              and productType not in self._contracts_refreshing):
+            self._contracts_refreshing.add(productType)
+            self._executor.submit(self._refresh_contracts, productType)
+        try:
+            return contracts[symbol]
+        except KeyError:
+            raise ValueError(f"未知合约: {productType} {symbol}")
+
+    def round_price(self, symbol, price, productType="USDT-FUTURES"):
+        """按合约价格精度四舍五入"""
+        return round(float(price), self.get_contract(symbol, productType)["pricePlace"])
+
+    def calc_open_size(self, symbol, productType, openAmount, openPrice, leverage=None):
+        """
+        本地计算可开张数：保证金 × 杠杆 / 价格，向下取整到 sizeMultiplier 和数量精度
+        不足最小下单量时返回 "0"
+        :return: 字符串格式张数，与 open-count 接口返回一致
+        """
+        spec = self.get_contract(symbol, productType)
+        raw = Decimal(str(openAmount)) * Decimal(str(leverage or 1)) / Decimal(str(openPrice))
+        multiplier = spec["sizeMultiplier"]
+        size = (raw / multiplier).to_integral_value(rounding=ROUND_DOWN) * multiplier
+        size = size.quantize(Decimal(1).scaleb(-spec["volumePlace"]), rounding=ROUND_DOWN)
+        if size < spec["minTradeNum"]:
+            return "0"
+        return format(size, "f")
+
+    # -----------------------------
+    # 下单前准备（并发）
+    # -----------------------------
+    def prepare_order(self, symbol, productType="USDT-FUTURES", marginCoin="USDT", fraction=0.25, leverage=20, min_available=10):
+        """
+        下单前一次性获取余额、最新价和可开张数
+        - 余额和最新价并发请求，张数用本地合约规格计算（size_mode="local" 时不再有第二轮请求）
+        - 余额低于 min_available 时不再计算张数，size 为 None
+        - 张数为 0（不足最小下单量）时 size 也为 None，由调用方在本地拒绝，不发出注定失败的下单
+        :return: {"available", "price", "size"}
+        """
+        available, price = self.gather(
+            (self.get_available, productType, marginCoin),
+            (self.get_last_price, symbol, productType),
+        )
+        result = {"available": available, "price": price, "size": None}
+        if available < min_available:
+            return result
+        size = self.get_open_size(symbol, productType, marginCoin, available * fraction, price, leverage)
+        if size is not None and Decimal(size) > 0:
+            result["size"] = size
+        return result
@@ -5,10 +5,64 @@ import hashlib
 import base64
 import requests
 import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from api.rate_limiter import RequestScheduler, SingleFlight, PRIORITY_ORDER, PRIORITY_READ
+from core.latency import latency
+
+# 默认超时（秒），未在 ENDPOINT_TIMEOUTS 中列出的接口使用该值
+DEFAULT_TIMEOUT = 10
+
+# 按接口路径配置的超时：(连接超时, 读取超时)
+ENDPOINT_TIMEOUTS = {
+    "/api/v2/mix/market/ticker": (3, 3),
+    "/api/v2/mix/order/place-order": (3, 5),
+    "/api/v2/mix/order/close-positions": (3, 5),
+}
+
+# 预热连接用的轻量公共接口
+WARMUP_PATH = "/api/v2/public/time"
+
+# 按官方文档配置的接口限频（次/秒）；未列出的接口使用 DEFAULT_RATE_LIMIT
+RATE_LIMITS = {
+    "/api/v2/public/time": 20,
+    "/api/v2/mix/market/ticker": 20,
+    "/api/v2/mix/market/candles": 20,
+    "/api/v2/mix/market/history-candles": 20,
+    "/api/v2/mix/market/contracts": 20,
+    "/api/v2/mix/account/accounts": 10,
+    "/api/v2/mix/account/open-count": 20,
+    "/api/v2/mix/position/single-position": 10,
+    "/api/v2/mix/position/all-position": 5,
+    "/api/v2/mix/order/place-order": 10,
+    "/api/v2/mix/order/cancel-order": 10,
+    "/api/v2/mix/order/close-positions": 1,
+}
+DEFAULT_RATE_LIMIT = 10
+
+# IP 级总限频：6000 次/分钟
+GLOBAL_RATE_LIMIT = 100
+
+# 下单、撤单、平仓优先于查询类请求
+ORDER_PATHS = {
+    "/api/v2/mix/order/place-order",
+    "/api/v2/mix/order/cancel-order",
+    "/api/v2/mix/order/close-positions",
+}
+
+
+def sign(api_secret, message):
+    """Signature = base64( HMAC_SHA256(secret, message) )，REST 与 WS 登录共用"""
+    mac = hmac.new(api_secret.encode("utf-8"), message.encode("utf-8"), hashlib.sha256)
+    return base64.b64encode(mac.digest()).decode()
+
 
 class BitgetApi:
-    def __init__(self, test_flag, api_key, api_secret, passphrase, base_url="https://api.bitget.com"):
+    def __init__(self, test_flag, api_key, api_secret, passphrase, base_url="https://api.bitget.com",
+                 pool_size=10, timeouts=None, rate_limits=None):
         """
         Bitget V2 API 封装
         :param api_key: API Key
@@ -16,6 +70,9 @@ class BitgetApi:
         :param passphrase: API Passphrase
         :param base_url: API 基础 URL, 默认实盘
         :param paptrading: 是否模拟盘, True 时自动加 header 'papertrading: 1'
+        :param pool_size: keep-alive 连接池大小
+        :param timeouts: 按接口路径覆盖超时，例如 {"/api/v2/mix/order/place-order": (2, 3)}
+        :param rate_limits: 按接口路径覆盖限频（次/秒）
         """
         self.api_key = api_key
         self.api_secret = api_secret
@@ -26,32 +83,99 @@ class BitgetApi:
         else:
             self.paptrading = "0"
 
+        # 复用 TCP/TLS 连接的会话
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        http_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", http_adapter)
+        self.session.mount("http://", http_adapter)
+        self.timeouts = dict(ENDPOINT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        # 客户端限频 + 优先级调度，相同的并发 GET 请求合并为一个
+        limits = dict(RATE_LIMITS)
+        if rate_limits:
+            limits.update(rate_limits)
+        self.scheduler = RequestScheduler(limits, DEFAULT_RATE_LIMIT, GLOBAL_RATE_LIMIT)
+        self.single_flight = SingleFlight()
+
+        # 每次请求的耗时记录：{"method", "path", "status", "elapsed_ms", "reused"}
+        self.timings = deque(maxlen=1000)
+        self._timing_lock = threading.Lock()
+
+    # -----------------------
+    # 连接池
+    # -----------------------
+    def _connections_opened(self):
+        """连接池累计新建的连接数"""
+        pools = self.session.get_adapter(self.base_url).poolmanager.pools
+        total = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_connections
+        return total
+
+    def warmup(self, connections=2):
+        """
+        预热连接池：并发请求轻量公共接口，提前完成 TCP/TLS 握手，
+        避免第一笔下单承担握手耗时
+        """
+        connections = max(1, min(connections, self.pool_size))
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            # 绕过读请求合并，保证每个请求各占一条连接
+            list(executor.map(lambda _: self._send("GET", WARMUP_PATH, None, False, PRIORITY_READ, ""), range(connections)))
+        return self._connections_opened()
+
+    def close(self):
+        self.session.close()
+
     # -----------------------
     # 请求封装
     # -----------------------
-    def _request(self, method, path, params=None, auth=False):
+    def _request(self, method, path, params=None, auth=False, priority=None):
         """
         通用请求方法
         :param method: "GET" 或 "POST"
         :param path: 接口路径，例如 "/api/v2/mix/market/ticker"
         :param params: dict 格式的参数，GET 会拼到 URL，POST 会转 JSON
         :param auth: 是否需要签名
+        :param priority: 调度优先级，默认下单类接口为 PRIORITY_ORDER，其余为 PRIORITY_READ
         """
+        if priority is None:
+            priority = PRIORITY_ORDER if path in ORDER_PATHS else PRIORITY_READ
+        method = method.upper()
+        query_string = urlencode(params) if params and method == "GET" else ""
+        if method == "GET":
+            # 同一资源的并发读请求共享一次在途请求
+            return self.single_flight.do(
+                (path, query_string),
+                lambda: self._send(method, path, params, auth, priority, query_string),
+            )
+        return self._send(method, path, params, auth, priority, query_string)
+
+    def _send(self, method, path, params, auth, priority, query_string):
+        # 限频：拿到令牌后再签名，避免排队导致时间戳过期
+        measure = latency.enabled
+        if measure:
+            queued = time.perf_counter_ns()
+        self.scheduler.acquire(path, priority)
+        if measure:
+            latency.record("rest.wait", time.perf_counter_ns() - queued)
+
         url = self.base_url + path
         headers = {}
         headers["Content-Type"] = "application/json"
         headers["paptrading"] = self.paptrading
-        query_string = ""
         body_str = ""
 
-        if params:
+        if query_string:
             # GET 请求拼接 URL
-            if method.upper() == "GET":
-                query_string = urlencode(params)
-                url += "?" + query_string
-            else:
-                # POST 请求转 JSON
-                body_str = json.dumps(params)
+            url += "?" + query_string
+        elif params and method != "GET":
+            # POST 请求转 JSON
+            body_str = json.dumps(params)
 
         # 签名处理
         if auth:
@@ -63,15 +187,36 @@ class BitgetApi:
                 "ACCESS-PASSPHRASE": self.passphrase,
             })
 
-        # 发起请求
-        resp = requests.request(
-            method,
-            url,
-            json=params if method.upper() != "GET" else None,
-            headers=headers,
-            timeout=10
-        )
-        return resp.json()
+        # 发起请求（连接池复用 keep-alive 连接）
+        # 通过连接池新建连接计数判断本次是否复用了连接；并发时为近似值
+        opened_before = self._connections_opened()
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(
+                method,
+                url,
+                json=params if method != "GET" else None,
+                headers=headers,
+                timeout=self.timeouts.get(path, DEFAULT_TIMEOUT)
+            )
+        except Exception:
+            if measure:
+                latency.record_rest(path, int((time.perf_counter() - start) * 1e9), ok=False)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._timing_lock:
+            self.timings.append({
+                "method": method,
+                "path": path,
+                "status": resp.status_code,
+                "elapsed_ms": elapsed_ms,
+                "reused": self._connections_opened() == opened_before,
+            })
+        result = resp.json()
+        if measure:
+            ok = resp.status_code < 400 and (not isinstance(result, dict) or result.get("code") in (None, "00000"))
+            latency.record_rest(path, int(elapsed_ms * 1e6), ok)
+        return result
 
     # -----------------------
     # 签名
@@ -88,9 +233,7 @@ class BitgetApi:
             msg += "?" + query_string
         if body_str:
             msg += body_str
-        mac = hmac.new(self.api_secret.encode("utf-8"), msg.encode("utf-8"), hashlib.sha256)
-        sign = base64.b64encode(mac.digest()).decode()
-        return timestamp, sign
+        return timestamp, sign(self.api_secret, msg)
 
     # -----------------------
     # 公共行情接口
@@ -103,6 +246,19 @@ class BitgetApi:
             }
         return self._request("GET", path, params=params, auth=False)
 
+    def get_contracts(self, productType="USDT-FUTURES", symbol=None):
+        """
+        获取合约信息（Get All Symbols - Contracts）
+        :param productType: 合约类型，如 "USDT-FUTURES"
+        :param symbol: 交易对，可选，不填返回全部
+        :return: data 中包含 sizeMultiplier、minTradeNum、pricePlace、volumePlace 等字段
+        """
+        path = "/api/v2/mix/market/contracts"
+        params = {"productType": productType}
+        if symbol is not None:
+            params["symbol"] = symbol
+        return self._request("GET", path, params=params, auth=False)
+
     def get_candles(self,
                     symbol: str,
                     productType: str,
@@ -139,6 +295,38 @@ class BitgetApi:
             params["limit"] = str(limit)
         return self._request("GET", path, params=params, auth=False)
 
+    def get_history_candles(self,
+                            symbol: str,
+                            productType: str,
+                            granularity: str,
+                            startTime: int = None,
+                            endTime: int = None,
+                            limit: int = None):
+        """
+        获取合约历史 K 线（Get Historical Candlestick），可查询更早的数据
+
+        :param symbol: 交易对符号，例如 "BTCUSDT"
+        :param productType: 合约类型，如 "USDT-FUTURES"
+        :param granularity: 周期，如 "1m", "5m", "15m", "1H", "4H" 等
+        :param startTime: 查询起始时间，Unix 毫秒时间戳（可选）
+        :param endTime: 查询结束时间，Unix 毫秒时间戳（可选）
+        :param limit: 返回条数（可选，最大 200）
+        :return: 返回 JSON 格式接口响应
+        """
+        path = "/api/v2/mix/market/history-candles"
+        params = {
+            "symbol": symbol,
+            "productType": productType,
+            "granularity": granularity
+        }
+        if startTime is not None:
+            params["startTime"] = str(startTime)
+        if endTime is not None:
+            params["endTime"] = str(endTime)
+        if limit is not None:
+            params["limit"] = str(limit)
+        return self._request("GET", path, params=params, auth=False)
+
     # -----------------------
     # 账户接口
     # -----------------------
@@ -187,6 +375,15 @@ class BitgetApi:
             }
         return self._request("GET", path, params=params, auth=True)
 
+    def get_all_positions(self, productType, marginCoin):
+        """查询全部持仓（私有 WS 断线重连后对账用）"""
+        path = "/api/v2/mix/position/all-position"
+        params = {
+            "productType": productType,
+            "marginCoin": marginCoin,
+            }
+        return self._request("GET", path, params=params, auth=True)
+
     # ------------------------------
     # 下单接口
     # ------------------------------
@@ -220,6 +417,33 @@ class BitgetApi:
         }
         return self._request("POST", path, params=params_dict, auth=True)
 
+    # ------------------------------
+    # 订单查询接口
+    # ------------------------------
+    def get_pending_orders(self, productType, symbol=None):
+        """查询当前未成交委托，data.entrustedList 为空时返回 None"""
+        path = "/api/v2/mix/order/orders-pending"
+        params = {"productType": productType}
+        if symbol is not None:
+            params["symbol"] = symbol
+        return self._request("GET", path, params=params, auth=True)
+
+    def get_order_detail(self, symbol, productType, orderId=None, clientOid=None):
+        """
+        查询订单详情，orderId 与 clientOid 二选一
+        :return: data 中 state 为 live / partially_filled / filled / canceled
+        """
+        path = "/api/v2/mix/order/detail"
+        params = {
+            "symbol": symbol,
+            "productType": productType,
+        }
+        if orderId is not None:
+            params["orderId"] = orderId
+        if clientOid is not None:
+            params["clientOid"] = clientOid
+        return self._request("GET", path, params=params, auth=True)
+
     # ------------------------------
     # 快速平仓接口
     # ------------------------------
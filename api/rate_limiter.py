@@ -0,0 +1,131 @@
+import threading
+import time
+from itertools import count
+
+# 请求优先级：数字越小越优先
+PRIORITY_ORDER = 0   # 下单 / 撤单 / 平仓
+PRIORITY_READ = 1    # 行情、账户等查询
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多存 capacity 个（默认 1 秒的量）"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def wait_time(self, now):
+        """补充令牌，返回还需等待多久才有一个令牌（0 表示立即可用）"""
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class RequestScheduler:
+    """
+    客户端限频与优先级调度
+    - 每个接口一个令牌桶，另有一个全局（IP 级）令牌桶
+    - 等待中的请求按 (优先级, 到达顺序) 发放令牌：
+      某接口自身令牌耗尽时，其它接口的低优先级请求仍可通过；
+      全局令牌不足时，排在前面的高优先级请求先拿，低优先级请求继续等待
+    """
+
+    def __init__(self, limits, default_rate=10, global_rate=None):
+        self._limits = dict(limits)
+        self._default_rate = default_rate
+        self._buckets = {}
+        self._global = TokenBucket(global_rate) if global_rate else None
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = count()
+        self.waited = 0   # 因限频而等待过的请求数
+
+    def _bucket(self, path):
+        bucket = self._buckets.get(path)
+        if bucket is None:
+            bucket = self._buckets[path] = TokenBucket(self._limits.get(path, self._default_rate))
+        return bucket
+
+    def acquire(self, path, priority=PRIORITY_READ):
+        """阻塞直到该请求拿到令牌"""
+        with self._cond:
+            waiter = [priority, next(self._seq), path, False]
+            self._waiters.append(waiter)
+            self._waiters.sort()
+            first = True
+            while True:
+                wait = self._grant()
+                if waiter[3]:
+                    return
+                if first:
+                    self.waited += 1
+                    first = False
+                self._cond.wait(wait)
+
+    def _grant(self):
+        """按优先级发放令牌，返回下次可能有令牌的等待时间"""
+        now = time.monotonic()
+        next_wait = None
+        granted = False
+        for waiter in list(self._waiters):
+            bucket = self._bucket(waiter[2])
+            wait = bucket.wait_time(now)
+            if wait > 0:
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+                continue
+            if self._global is not None:
+                wait = self._global.wait_time(now)
+                if wait > 0:
+                    next_wait = wait if next_wait is None else min(next_wait, wait)
+                    break
+                self._global.take()
+            bucket.take()
+            waiter[3] = True
+            self._waiters.remove(waiter)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+        return next_wait
+
+
+class SingleFlight:
+    """
+    合并相同的并发读请求：同一 key 同时只有一个请求在途，其它调用方等待并共享结果
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.merged = 0   # 被合并掉的请求数
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.merged += 1
+                leader = False
+            else:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+                leader = True
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
@@ -0,0 +1,131 @@
+import numpy as np
+from config import strategy_config
+from indicators.vectorized import macd, cross_signals
+
+# 资金费结算周期（Bitget USDT 合约默认 8 小时，整点 00:00/08:00/16:00 UTC）
+FUNDING_INTERVAL_MS = 8 * 60 * 60 * 1000
+
+
+def candle_columns(candles):
+    """
+    取出 startTime 和 close 两列
+    :param candles: (n, >=5) 数组（列顺序同 CandleStore.COLUMNS）或 {"startTime": ..., "close": ...}
+    """
+    if isinstance(candles, dict):
+        return np.asarray(candles["startTime"], dtype=np.int64), np.asarray(candles["close"], dtype=float)
+    candles = np.asarray(candles)
+    return candles[:, 0].astype(np.int64), candles[:, 4].astype(float)
+
+
+class BacktestResult:
+    """回测结果：成交列表、逐 K 线权益曲线和汇总指标"""
+
+    def __init__(self, trades, equity, times, initial_equity):
+        self.trades = trades
+        self.equity = equity
+        self.times = times
+        self.initial_equity = initial_equity
+
+    def summary(self):
+        equity = self.equity
+        peak = np.maximum.accumulate(equity) if len(equity) else equity
+        drawdown = float(((peak - equity) / peak).max()) if len(equity) else 0.0
+        pnls = np.array([t["pnl"] for t in self.trades]) if self.trades else np.zeros(0)
+        return {
+            "final_equity": float(equity[-1]) if len(equity) else self.initial_equity,
+            "total_return": float(equity[-1] / self.initial_equity - 1) if len(equity) else 0.0,
+            "max_drawdown": drawdown,
+            "trades": len(self.trades),
+            "win_rate": float((pnls > 0).mean()) if len(pnls) else 0.0,
+            "fees": float(sum(t["fee"] for t in self.trades)),
+            "funding": float(sum(t["funding"] for t in self.trades)),
+        }
+
+
+def simulate(times, close, signals, fraction=strategy_config.POSITION_FRACTION, leverage=strategy_config.LEVERAGE,
+             initial_equity=1000.0, fee_rate=0.0006, funding_rate=0.0001,
+             min_available=strategy_config.MIN_AVAILABLE, initial_state="toOrder", warmup=0):
+    """
+    按 Strategy 的状态机模拟成交
+    - toOrder：金叉开多 / 死叉开空
+    - ordered_long：死叉平多，回到 toOrder；ordered_short：金叉平空，回到 toOrder
+    - 以信号 K 线收盘价市价成交，开平各收一次 taker 手续费
+    - 持仓跨过每个资金费结算时刻收/付一次资金费（多头在费率为正时支付）
+    只在信号点上走 Python 循环，逐 K 线的权益曲线用向量运算生成
+    """
+    n = len(close)
+    idx = np.flatnonzero(signals)
+    idx = idx[idx >= warmup]
+
+    trades = []
+    cash = initial_equity
+    state = initial_state
+    entry = None
+    for i in idx:
+        signal = signals[i]
+        price = close[i]
+        if state == "toOrder":
+            if cash < min_available:
+                continue
+            direction = 1 if signal > 0 else -1
+            qty = cash * fraction * leverage / price
+            fee = qty * price * fee_rate
+            cash -= fee
+            entry = (i, direction, qty, price, fee)
+            state = "ordered_long" if direction > 0 else "ordered_short"
+        elif (state == "ordered_long" and signal < 0) or (state == "ordered_short" and signal > 0):
+            cash = _close_trade(trades, entry, i, times, price, cash, fee_rate, funding_rate)
+            entry = None
+            state = "toOrder"
+
+    # 逐 K 线权益：持仓按收盘价逐根盯市，手续费和资金费在发生的 K 线上扣除
+    position = np.zeros(n)
+    costs = np.zeros(n)
+    for t in trades:
+        position[t["entry_index"]:t["exit_index"]] = t["direction"] * t["qty"]
+        costs[t["entry_index"]] += t["entry_fee"]
+        costs[t["exit_index"]] += t["exit_fee"] + t["funding"]
+    if entry is not None:
+        position[entry[0]:] = entry[1] * entry[2]
+        costs[entry[0]] += entry[4]
+    step = np.zeros(n)
+    step[1:] = position[:-1] * np.diff(close)
+    equity = initial_equity + np.cumsum(step - costs)
+    return BacktestResult(trades, equity, times, initial_equity)
+
+
+def _close_trade(trades, entry, i, times, price, cash, fee_rate, funding_rate):
+    entry_index, direction, qty, entry_price, entry_fee = entry
+    exit_fee = qty * price * fee_rate
+    settlements = int(times[i] // FUNDING_INTERVAL_MS - times[entry_index] // FUNDING_INTERVAL_MS)
+    funding = direction * qty * entry_price * funding_rate * settlements
+    gross = direction * qty * (price - entry_price)
+    trades.append({
+        "entry_index": int(entry_index),
+        "exit_index": int(i),
+        "entry_time": int(times[entry_index]),
+        "exit_time": int(times[i]),
+        "direction": direction,
+        "qty": qty,
+        "entry_price": float(entry_price),
+        "exit_price": float(price),
+        "entry_fee": entry_fee,
+        "exit_fee": exit_fee,
+        "fee": entry_fee + exit_fee,
+        "funding": funding,
+        "pnl": gross - entry_fee - exit_fee - funding,
+    })
+    return cash + gross - exit_fee - funding
+
+
+def run_backtest(candles, short=strategy_config.MACD_SHORT, long=strategy_config.MACD_LONG,
+                 signal=strategy_config.MACD_SIGNAL, **kwargs):
+    """
+    向量化回测：一次 NumPy 计算整段 MACD 和交叉信号，再按状态机模拟成交
+    :param candles: 历史K线，见 candle_columns
+    :param kwargs: 透传给 simulate（fraction、leverage、fee_rate、funding_rate 等）
+    """
+    times, close = candle_columns(candles)
+    dif, dea, _ = macd(close, short, long, signal)
+    signals = cross_signals(dif, dea)
+    return simulate(times, close, signals, **kwargs)
@@ -0,0 +1,121 @@
+import numpy as np
+from config import strategy_config
+from core.event_bus import EventBus
+from strategy.strategy import Strategy
+from execution.order_manager import OrderManager
+from backtest.engine import BacktestResult, candle_columns, run_backtest, _close_trade
+
+
+class SimAdapter:
+    """
+    回放用的模拟交易接口，实现 Strategy 用到的 APIAdapter 方法
+    以当前K线收盘价成交，手续费/资金费与向量化回测使用同一套计算
+    """
+
+    def __init__(self, times, initial_equity=1000.0, fee_rate=0.0006, funding_rate=0.0001):
+        self.times = times
+        self.cash = initial_equity
+        self.fee_rate = fee_rate
+        self.funding_rate = funding_rate
+        self.trades = []
+        self.entry = None   # (index, direction, qty, price, fee)
+        self.index = 0
+        self.price = None
+
+    def set_bar(self, index, price):
+        self.index = index
+        self.price = price
+
+    def get_single_position(self, symbol, productType, marginCoin):
+        return {"data": []}
+
+    def get_last_price(self, symbol, productType):
+        return self.price
+
+    def prepare_order(self, symbol, productType="USDT-FUTURES", marginCoin="USDT", fraction=0.25, leverage=20, min_available=10):
+        available = self.cash if self.entry is None else 0.0
+        result = {"available": available, "price": self.price, "size": None}
+        if available >= min_available:
+            result["size"] = available * fraction * leverage / self.price
+        return result
+
+    def place_order(self, symbol, productType, marginMode, marginCoin, price, size, side, order_type,
+                    time_in_force="GTC", reduce_only=None, client_oid=None, tradeSide=None):
+        direction = 1 if side == "buy" else -1
+        fee = size * self.price * self.fee_rate
+        self.cash -= fee
+        self.entry = (self.index, direction, size, self.price, fee)
+        return {"code": "00000", "data": {"clientOid": client_oid}}
+
+    def close_position(self, symbol, productType, holdSide):
+        if self.entry is None:
+            return {"code": "22002", "msg": "No position to close"}
+        self.cash = _close_trade(self.trades, self.entry, self.index, self.times, self.price,
+                                 self.cash, self.fee_rate, self.funding_rate)
+        self.entry = None
+        return {"code": "00000", "data": {}}
+
+    def equity(self):
+        if self.entry is None:
+            return self.cash
+        _, direction, qty, price, _ = self.entry
+        return self.cash + direction * qty * (self.price - price)
+
+
+def _rows(candles):
+    """转成 Strategy 接收的数值K线行"""
+    if isinstance(candles, dict):
+        times, close = candle_columns(candles)
+        return [(int(t), c, c, c, c, 0.0, 0.0, 0.0) for t, c in zip(times, close)]
+    candles = np.asarray(candles, dtype=float)
+    return [(int(r[0]),) + tuple(r[1:8]) for r in candles]
+
+
+def replay(candles, short=strategy_config.MACD_SHORT, long=strategy_config.MACD_LONG,
+           signal=strategy_config.MACD_SIGNAL, symbol="BTCUSDT", initial_equity=1000.0,
+           fee_rate=0.0006, funding_rate=0.0001, fraction=strategy_config.POSITION_FRACTION,
+           leverage=strategy_config.LEVERAGE, min_available=strategy_config.MIN_AVAILABLE):
+    """
+    事件驱动回放：逐根把已收盘K线送进真实的 Strategy.on_candle_update，
+    用于核对向量化回测与实盘代码路径的一致性（速度远慢于 run_backtest）
+    """
+    times, close = candle_columns(candles)
+    adapter = SimAdapter(times, initial_equity, fee_rate, funding_rate)
+    bus = EventBus()
+    # 同步下单、同步回报，保证回放结果确定
+    order_manager = OrderManager(adapter, bus, workers=0, fill_checks=0)
+    strategy = Strategy(adapter, symbol, "USDT-FUTURES", "USDT", event_bus=bus,
+                        macd_short=short, macd_long=long, macd_signal=signal,
+                        fraction=fraction, leverage=leverage, min_available=min_available,
+                        order_manager=order_manager)
+    equity = np.empty(len(close))
+    for i, row in enumerate(_rows(candles)):
+        adapter.set_bar(i, close[i])
+        strategy.on_candle_update([row])
+        equity[i] = adapter.equity()
+    return BacktestResult(adapter.trades, equity, times, initial_equity)
+
+
+def check_parity(candles, short=strategy_config.MACD_SHORT, long=strategy_config.MACD_LONG,
+                 signal=strategy_config.MACD_SIGNAL, **kwargs):
+    """
+    对比向量化回测与事件驱动回放的成交
+    :param kwargs: initial_equity、fee_rate、funding_rate、fraction、leverage、min_available
+    :return: {"match", "vectorized", "replay", "first_mismatch"}
+    """
+    fast = run_backtest(candles, short, long, signal, **kwargs)
+    slow = replay(candles, short, long, signal, **kwargs)
+    key = lambda t: (t["entry_index"], t["exit_index"], t["direction"])
+    fast_trades = [key(t) for t in fast.trades]
+    slow_trades = [key(t) for t in slow.trades]
+    mismatch = None
+    for i, (a, b) in enumerate(zip(fast_trades, slow_trades)):
+        if a != b:
+            mismatch = {"trade": i, "vectorized": a, "replay": b}
+            break
+    return {
+        "match": mismatch is None and len(fast_trades) == len(slow_trades),
+        "vectorized": len(fast_trades),
+        "replay": len(slow_trades),
+        "first_mismatch": mismatch,
+    }
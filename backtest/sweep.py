@@ -0,0 +1,129 @@
+"""
+策略参数扫描
+- 网格或随机搜索 MACD(short/long/signal)、window_size、开仓比例和杠杆
+- 多进程并行回测，K线数组放在共享内存中，各进程直接映射，不做 pickle 拷贝
+- 结果按指标排序输出
+
+运行：python -m backtest.sweep --symbol BTCUSDT --granularity 1m --cache data/candles
+"""
+import argparse
+import itertools
+import random
+from multiprocessing import Pool, shared_memory
+import numpy as np
+from config import strategy_config
+from backtest.engine import run_backtest
+
+# 默认搜索空间
+DEFAULT_SPACE = {
+    "short": [8, 12, 16],
+    "long": [21, 26, 34],
+    "signal": [7, 9, 12],
+    "window_size": [strategy_config.WINDOW_SIZE],
+    "fraction": [0.1, strategy_config.POSITION_FRACTION],
+    "leverage": [5, 10, strategy_config.LEVERAGE],
+}
+
+# 子进程中映射到共享内存的K线列
+_shared = {}
+
+
+def grid(space):
+    """网格搜索：全部组合（剔除 short >= long）"""
+    keys = list(space)
+    combos = (dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys)))
+    return [p for p in combos if p["short"] < p["long"]]
+
+
+def random_search(space, n, seed=None):
+    """随机搜索：从每个维度独立抽样 n 组（剔除 short >= long）"""
+    rng = random.Random(seed)
+    params = []
+    while len(params) < n:
+        p = {k: rng.choice(list(v)) for k, v in space.items()}
+        if p["short"] < p["long"]:
+            params.append(p)
+    return params
+
+
+def _attach(names, length):
+    """子进程初始化：映射共享内存中的 startTime/close 两列"""
+    for column, (name, dtype) in names.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _shared[column] = np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+        _shared[column + "_shm"] = shm
+
+
+def _run(params):
+    result = run_backtest(
+        {"startTime": _shared["startTime"], "close": _shared["close"]},
+        params["short"], params["long"], params["signal"],
+        fraction=params["fraction"], leverage=params["leverage"], warmup=params["window_size"],
+    )
+    return dict(params, **result.summary())
+
+
+def sweep(candles, params_list, processes=None, metric="total_return"):
+    """
+    并行回测一组参数
+    :param candles: {"startTime": ..., "close": ...}（如 CandleDownloader.load 的结果）
+    :param params_list: grid() / random_search() 的结果
+    :param metric: 排序指标，summary() 中的字段
+    :return: 按 metric 从高到低排序的结果列表
+    """
+    columns = {
+        "startTime": np.ascontiguousarray(candles["startTime"], dtype=np.int64),
+        "close": np.ascontiguousarray(candles["close"], dtype=np.float64),
+    }
+    length = len(columns["close"])
+    blocks = []
+    names = {}
+    try:
+        for column, array in columns.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+            blocks.append(shm)
+            names[column] = (shm.name, array.dtype.str)
+        with Pool(processes, initializer=_attach, initargs=(names, length)) as pool:
+            results = pool.map(_run, params_list, chunksize=max(1, len(params_list) // (4 * (processes or 1))))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return sorted(results, key=lambda r: r[metric], reverse=True)
+
+
+def format_table(results, top=20):
+    """排名表（文本）"""
+    headers = ["#", "short", "long", "signal", "window", "fraction", "lev", "return", "max_dd", "trades", "win"]
+    lines = ["  ".join(f"{h:>8}" for h in headers)]
+    for rank, r in enumerate(results[:top], 1):
+        row = [rank, r["short"], r["long"], r["signal"], r["window_size"], r["fraction"], r["leverage"],
+               f"{r['total_return']:.2%}", f"{r['max_drawdown']:.2%}", r["trades"], f"{r['win_rate']:.2%}"]
+        lines.append("  ".join(f"{v:>8}" for v in row))
+    return "\n".join(lines)
+
+
+def main():
+    from dataProcess.feed import CandleDownloader
+    parser = argparse.ArgumentParser(description="策略参数扫描")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--product-type", default="USDT-FUTURES")
+    parser.add_argument("--granularity", default="1m")
+    parser.add_argument("--cache", default="data/candles")
+    parser.add_argument("--random", type=int, default=0, help="随机搜索组数，0 表示网格搜索")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--metric", default="total_return")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    candles = CandleDownloader(None, cache_root=args.cache).load(args.symbol, args.product_type, args.granularity)
+    if len(candles["close"]) == 0:
+        raise SystemExit(f"缓存中没有 {args.symbol} {args.granularity} 的K线，请先用 CandleDownloader.sync 下载")
+    params_list = random_search(DEFAULT_SPACE, args.random) if args.random else grid(DEFAULT_SPACE)
+    results = sweep(candles, params_list, args.processes, args.metric)
+    print(format_table(results, args.top))
+
+
+if __name__ == "__main__":
+    main()
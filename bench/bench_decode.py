@@ -0,0 +1,72 @@
+"""
+WS 解码吞吐基准（单核 messages/sec）
+旧路径：json.loads 全量解析每一帧 + Strategy 中 DataFrame.astype(float)
+新路径：控制帧前缀跳过 + 可选 orjson + 入口处一次性转数值元组
+
+运行：python -m bench.bench_decode
+"""
+import json
+import time
+import pandas as pd
+from ws.bitget.bitget_decode import loads, is_control, decode_candles, JSON_BACKEND
+
+COLUMNS = ["startTime", "open", "high", "low", "close", "vol1", "vol2", "vol3"]
+
+
+def make_frames(n=20000, pong_every=20):
+    frames = []
+    for i in range(n):
+        if i % pong_every == 0:
+            frames.append("pong")
+            continue
+        frames.append(json.dumps({
+            "action": "update",
+            "arg": {"instType": "USDT-FUTURES", "channel": "candle1m", "instId": "BTCUSDT"},
+            "data": [[str(1700000000000 + i // 30 * 60000), "37000.1", "37010.5", "36990.2",
+                      str(37000 + i % 17), "12.345", "456789.01", "456789.01"]],
+            "ts": 1700000000000 + i,
+        }, separators=(",", ":")))
+    return frames
+
+
+def old_path(frames):
+    for message in frames:
+        try:
+            msg = json.loads(message)
+        except Exception:
+            continue
+        if "data" in msg:
+            df = pd.DataFrame(msg["data"], columns=COLUMNS)
+            df[COLUMNS[1:]] = df[COLUMNS[1:]].astype(float)
+
+
+def new_path(frames):
+    for message in frames:
+        if is_control(message):
+            continue
+        msg = loads(message)
+        if "data" in msg:
+            decode_candles(msg["data"])
+
+
+def measure(fn, frames, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(frames)
+        best = min(best, time.perf_counter() - start)
+    return len(frames) / best
+
+
+def main():
+    frames = make_frames()
+    old_rate = measure(old_path, frames[:2000])
+    new_rate = measure(new_path, frames)
+    print(f"JSON 后端: {JSON_BACKEND}")
+    print(f"旧路径: {old_rate:,.0f} msg/s/core")
+    print(f"新路径: {new_rate:,.0f} msg/s/core  ({new_rate / old_rate:.0f}x)")
+    return {"old_msg_per_sec": old_rate, "new_msg_per_sec": new_rate}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+风控单笔开销基准
+- 突发提交大量开仓意图，测量 RiskEngine.check 的耗时分布（放行与拒绝两种路径）
+- 同一批意图走 OrderManager(workers=0) 全流程，对比有无风控的单笔耗时差
+
+运行：python -m bench.bench_risk
+"""
+import time
+from core.event_bus import EventBus
+from execution.order_manager import OrderIntent, OrderManager
+from execution.risk_control import RiskEngine
+
+SYMBOL = "BTCUSDT"
+PRICE = 37000.0
+
+
+class FakeAdapter:
+    """不发请求的下单接口：固定价格和数量，下单立即受理"""
+
+    def prepare_order(self, symbol, productType="USDT-FUTURES", marginCoin="USDT", fraction=0.25, leverage=20, min_available=10):
+        return {"available": 1000.0, "price": PRICE, "size": "0.001"}
+
+    def place_order(self, *args):
+        return {"code": "00000", "data": {"orderId": "1"}}
+
+
+def make_intents(n):
+    intents = []
+    for _ in range(n):
+        intent = OrderIntent("open", SYMBOL, "USDT-FUTURES", "USDT", side="buy", tradeSide="open")
+        intent.price, intent.size = PRICE, "0.001"
+        intents.append(intent)
+    return intents
+
+
+def make_risk(bus, **kwargs):
+    risk = RiskEngine(event_bus=bus, **kwargs)
+    risk.update_price(SYMBOL, PRICE)
+    return risk
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+    return {"mean_us": sum(samples) / len(samples) * 1e6, "p50_us": pick(0.5), "p99_us": pick(0.99),
+            "max_us": samples[-1] * 1e6}
+
+
+def bench_check(risk, intents):
+    samples = []
+    for intent in intents:
+        start = time.perf_counter()
+        risk.check(intent)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_pipeline(risk, n, bus):
+    manager = OrderManager(FakeAdapter(), bus, workers=0, fill_checks=0, risk=risk)
+    start = time.perf_counter()
+    for _ in range(n):
+        manager.open(SYMBOL, "USDT-FUTURES", "USDT", "buy")
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(n=10000):
+    bus = EventBus()
+    unlimited = dict(max_symbol_notional=float("inf"), max_account_notional=float("inf"),
+                     max_order_rate=float("inf"))
+    passed = bench_check(make_risk(bus, **unlimited), make_intents(n))
+    # 默认限额下突发：前几笔放行，其余被频率/额度拦截
+    limited_risk = make_risk(bus)
+    rejected = bench_check(limited_risk, make_intents(n))
+    without = bench_pipeline(None, n, bus)
+    with_risk = bench_pipeline(make_risk(bus, **unlimited), n, bus)
+
+    print(f"突发 {n} 笔开仓意图")
+    print("放行路径: " + ", ".join(f"{k}={v:.2f}" for k, v in passed.items()))
+    print("拒绝路径: " + ", ".join(f"{k}={v:.2f}" for k, v in rejected.items())
+          + f"  (拒绝 {limited_risk.rejected}/{limited_risk.checked})")
+    print(f"OrderManager 单笔: 无风控 {without:.2f}us, 有风控 {with_risk:.2f}us, 差 {with_risk - without:.2f}us")
+    return {"passed": passed, "rejected": rejected, "pipeline_without_us": without, "pipeline_with_us": with_risk}
+
+
+if __name__ == "__main__":
+    main()
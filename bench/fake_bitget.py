@@ -0,0 +1,282 @@
+"""
+本地 Bitget 替身，只依赖标准库
+- FakeBitgetWS：公共 WS（握手 + 帧编解码），收到 subscribe 后按设定速率推送K线帧（合成或录制的）
+- FakeBitgetREST：candles / ticker / accounts / open-count / contracts / single-position / place-order / close-positions 等，
+  可设置每个请求的固定延迟
+供 bench.run_bench 驱动真实的 BitgetWebSocket → EventBus → Strategy → APIAdapter 链路
+"""
+import base64
+import hashlib
+import json
+import math
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def synthetic_frames(n, symbol="BTCUSDT", interval="1m", period=40, base=37000.0, start=1700000000000):
+    """
+    合成K线推送帧：收盘价为正弦波，每 period/2 根左右出现一次 MACD 交叉，保证持续有下单
+    每帧一根新K线（startTime 递增）
+    """
+    step = 60000
+    frames = []
+    for i in range(n):
+        close = base * (1 + 0.01 * math.sin(2 * math.pi * i / period))
+        ts = str(start + i * step)
+        frames.append(json.dumps({
+            "action": "update",
+            "arg": {"instType": "USDT-FUTURES", "channel": f"candle{interval}", "instId": symbol},
+            "data": [[ts, f"{close:.1f}", f"{close * 1.001:.1f}", f"{close * 0.999:.1f}", f"{close:.1f}",
+                      "12.345", "456789.01", "456789.01"]],
+            "ts": int(ts),
+        }, separators=(",", ":")))
+    return frames
+
+
+# -----------------------------
+# WebSocket
+# -----------------------------
+def _encode_frame(payload, opcode=0x1):
+    # 服务端发往客户端的帧不加掩码
+    header = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        header += bytes([n])
+    elif n < 1 << 16:
+        header += bytes([126]) + struct.pack(">H", n)
+    else:
+        header += bytes([127]) + struct.pack(">Q", n)
+    return header + payload
+
+
+def _recv_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        buf += chunk
+    return buf
+
+
+def _read_frame(sock):
+    b0, b1 = _recv_exact(sock, 2)
+    opcode = b0 & 0x0F
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack(">H", _recv_exact(sock, 2))[0]
+    elif n == 127:
+        n = struct.unpack(">Q", _recv_exact(sock, 8))[0]
+    mask = _recv_exact(sock, 4) if b1 & 0x80 else None
+    payload = _recv_exact(sock, n)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+class FakeBitgetWS:
+    """
+    :param frames: 要推送的文本帧列表（synthetic_frames 或 ws.frame_journal.read_frames 的结果）
+    :param rate: 每秒推送帧数，0 表示尽快
+    """
+
+    def __init__(self, frames, rate=1000, host="127.0.0.1", port=0):
+        self.frames = frames
+        self.rate = rate
+        self._server = socket.create_server((host, port))
+        self.host, self.port = self._server.getsockname()[:2]
+        self.url = f"ws://{self.host}:{self.port}"
+        self.sent = 0
+        self.send_started = None
+        self.send_finished = None
+        self.done = threading.Event()
+        self._running = False
+        self._clients = []
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._accept, name="fake-ws", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        for sock in self._clients:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._server.close()
+
+    def _accept(self):
+        while self._running:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._clients.append(sock)
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _handshake(self, sock):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("握手前连接已关闭")
+            request += chunk
+        key = None
+        for line in request.decode("latin-1").split("\r\n"):
+            if line.lower().startswith("sec-websocket-key:"):
+                key = line.split(":", 1)[1].strip()
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+    def _serve(self, sock):
+        lock = threading.Lock()
+        try:
+            self._handshake(sock)
+            while self._running:
+                opcode, payload = _read_frame(sock)
+                if opcode == 0x8:
+                    with lock:
+                        sock.sendall(_encode_frame(payload[:2], 0x8))
+                    return
+                if opcode == 0x9:
+                    with lock:
+                        sock.sendall(_encode_frame(payload, 0xA))
+                    continue
+                if opcode != 0x1:
+                    continue
+                text = payload.decode()
+                if text == "ping":
+                    with lock:
+                        sock.sendall(_encode_frame(b"pong"))
+                    continue
+                msg = json.loads(text)
+                if msg.get("op") == "subscribe":
+                    for arg in msg["args"]:
+                        ack = json.dumps({"event": "subscribe", "arg": arg}).encode()
+                        with lock:
+                            sock.sendall(_encode_frame(ack))
+                    threading.Thread(target=self._stream, args=(sock, lock), daemon=True).start()
+        except (ConnectionError, OSError):
+            pass
+
+    def _stream(self, sock, lock):
+        encoded = [_encode_frame(f.encode()) for f in self.frames]
+        self.send_started = time.perf_counter()
+        try:
+            for i, frame in enumerate(encoded):
+                if self.rate:
+                    due = self.send_started + i / self.rate
+                    wait = due - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                with lock:
+                    sock.sendall(frame)
+                self.sent += 1
+        except OSError:
+            pass
+        self.send_finished = time.perf_counter()
+        self.done.set()
+
+
+# -----------------------------
+# REST
+# -----------------------------
+class FakeBitgetREST:
+    """
+    :param latency: 每个请求的固定延迟（秒），模拟网络往返
+    """
+
+    def __init__(self, latency=0.005, price=37000.0, available=1000.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.price = price
+        self.available = available
+        self.candles = []           # /market/candles 的数据源：[[startTime, o, h, l, c, v1, v2, v3], ...]（字符串）
+        self.orders = []            # (perf_counter 时间, 路径, 请求体)
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True      # 头和正文分两次写，不关 Nagle 会多出约 40ms
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, body):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                fake.requests += 1
+                time.sleep(fake.latency)
+                self._reply(fake.handle_get(url.path, {k: v[0] for k, v in parse_qs(url.query).items()}))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                fake.requests += 1
+                fake.orders.append((time.perf_counter(), self.path, body))
+                time.sleep(fake.latency)
+                self._reply(fake.handle_post(self.path, body))
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self.url = f"http://{self.host}:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="fake-rest", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle_get(self, path, params):
+        ok = lambda data: {"code": "00000", "msg": "success", "data": data}
+        if path == "/api/v2/public/time":
+            return ok({"serverTime": str(int(time.time() * 1000))})
+        if path == "/api/v2/mix/market/ticker":
+            return ok([{"symbol": params.get("symbol"), "lastPr": str(self.price)}])
+        if path == "/api/v2/mix/market/candles":
+            start = int(params.get("startTime") or 0)
+            end = int(params.get("endTime") or 1 << 62)
+            rows = [row for row in self.candles if start <= int(row[0]) <= end]
+            return ok(rows[-int(params.get("limit") or 100):])
+        if path == "/api/v2/mix/market/contracts":
+            return ok([{"symbol": "BTCUSDT", "sizeMultiplier": "0.0001", "minTradeNum": "0.0001",
+                        "pricePlace": "1", "volumePlace": "4"}])
+        if path == "/api/v2/mix/account/accounts":
+            return ok([{"marginCoin": "USDT", "available": str(self.available), "accountEquity": str(self.available)}])
+        if path == "/api/v2/mix/account/open-count":
+            size = float(params["openAmount"]) * float(params.get("leverage") or 1) / float(params["openPrice"])
+            return ok({"size": f"{size:.4f}"})
+        if path == "/api/v2/mix/position/single-position":
+            return ok([])
+        if path == "/api/v2/mix/order/detail":
+            return ok({"orderId": "1", "clientOid": params.get("clientOid"), "state": "filled"})
+        return {"code": "40404", "msg": f"unknown path {path}", "data": None}
+
+    def handle_post(self, path, body):
+        ok = lambda data: {"code": "00000", "msg": "success", "data": data}
+        if path == "/api/v2/mix/order/place-order":
+            return ok({"orderId": str(len(self.orders)), "clientOid": body.get("clientOid")})
+        if path == "/api/v2/mix/order/close-positions":
+            return ok({"successList": [{"orderId": str(len(self.orders))}], "failureList": []})
+        return {"code": "40404", "msg": f"unknown path {path}", "data": None}
@@ -0,0 +1,235 @@
+"""
+基准套件
+- 链路：本地假 WS/REST（bench.fake_bitget）驱动真实的 BitgetWebSocket → EventBus → Strategy → OrderManager → APIAdapter
+  · 不限速推送：持续吞吐 msgs/sec、丢帧数
+  · 按设定速率推送：行情帧到下单受理的延迟（tick-to-ack）及各阶段延迟
+- 指标微基准：Indicators.macd/ma/rsi、StreamingMACD、向量化 MACD
+- --save 保存为基线，之后每次运行与基线对比，超出容差的指标视为回退（退出码 1）
+
+运行：python -m bench.run_bench [--frames 20000] [--rate 2000] [--rest-latency 0.005] [--save]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import numpy as np
+import pandas as pd
+from api.adapter_api import APIAdapter
+from core.event_bus import EventBus
+from core.latency import latency
+from execution.order_manager import OrderManager
+from indicators.macd import Indicators
+from indicators.streaming import StreamingMACD
+from indicators import vectorized
+from log import logger as log
+from strategy.strategy import Strategy
+from ws.bitget.bitget_ws import BitgetWebSocket
+from bench.fake_bitget import FakeBitgetREST, FakeBitgetWS, synthetic_frames
+
+SYMBOL = "BTCUSDT"
+DEFAULT_BASELINE = "data/bench/baseline.json"
+
+# 指标方向：higher 越大越好，lower 越小越好
+DIRECTIONS = {
+    "pipeline.msgs_per_sec": "higher",
+    "pipeline.dropped": "lower",
+    "paced.dropped": "lower",
+    "paced.tick_to_ack_p50_ms": "lower",
+    "paced.tick_to_ack_p99_ms": "lower",
+    "paced.ws_decode_p99_us": "lower",
+    "paced.bus_queue_p99_us": "lower",
+    "micro.macd_100_us": "lower",
+    "micro.ma_100_us": "lower",
+    "micro.rsi_100_us": "lower",
+    "micro.macd_100k_ms": "lower",
+    "micro.streaming_macd_ns": "lower",
+    "micro.vectorized_macd_1m_ms": "lower",
+}
+
+
+# -----------------------------
+# 链路基准
+# -----------------------------
+def run_pipeline(frames, rate, rest_latency, timeout=60):
+    """
+    启动假 WS/REST，跑完整链路
+    :return: {"sent", "delivered", "dropped", "msgs_per_sec", "orders", "stages"}
+    """
+    latency.reset()
+    latency.enable()
+    rest = FakeBitgetREST(latency=rest_latency).start()
+    ws_server = FakeBitgetWS(frames, rate=rate).start()
+    bus = EventBus()
+    adapter = APIAdapter("bitget", True, "key", "secret", "pass", base_url=rest.url)
+    adapter.load_contracts("USDT-FUTURES")
+    order_manager = OrderManager(adapter, bus, fill_checks=0)
+    strategy = Strategy(adapter, SYMBOL, "USDT-FUTURES", "USDT", candle_interval="1m",
+                        event_bus=bus, order_manager=order_manager)
+
+    delivered = [0, None, None]   # 条数, 首条时间, 末条时间
+
+    def count(candles):
+        now = time.perf_counter()
+        if delivered[1] is None:
+            delivered[1] = now
+        delivered[2] = now
+        delivered[0] += 1
+
+    bus.on(f"market.candle1m.{SYMBOL}", count)
+    ws = BitgetWebSocket(ws_server.url, inst_type="USDT-FUTURES", symbol=SYMBOL, candle_interval="1m", event_bus=bus)
+    bus.start()
+    thread = ws.connect()
+    try:
+        ws_server.done.wait(timeout)
+        # 等分发线程处理完积压
+        deadline = time.monotonic() + 5
+        while delivered[0] + bus.dropped < ws_server.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        order_manager.stop()
+    finally:
+        ws.close()
+        thread.join(5)
+        bus.stop()
+        adapter.close()
+        rest.stop()
+        ws_server.stop()
+        latency.enable(False)
+
+    span = (delivered[2] - delivered[1]) if delivered[0] > 1 else 0.0
+    return {
+        "sent": ws_server.sent,
+        "delivered": delivered[0],
+        "dropped": ws_server.sent - delivered[0],
+        "msgs_per_sec": delivered[0] / span if span > 0 else 0.0,
+        "orders": len(rest.orders),
+        "state": strategy.state,
+        "stages": latency.snapshot()["stages"],
+    }
+
+
+# -----------------------------
+# 指标微基准
+# -----------------------------
+def best_of(fn, number, repeat=5):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def run_micro():
+    rng = np.random.default_rng(0)
+    close = 37000 * np.exp(np.cumsum(rng.normal(0, 0.001, 100_000)))
+    df_small = pd.DataFrame({"close": close[:100]})
+    df_large = pd.DataFrame({"close": close})
+
+    macd = StreamingMACD()
+    values = close.tolist()
+    start = time.perf_counter()
+    for i, c in enumerate(values):
+        macd.update(i, c)
+    streaming = (time.perf_counter() - start) / len(values)
+
+    series = np.tile(close, 10)
+    return {
+        "macd_100_us": best_of(lambda: Indicators.macd(df_small), 200) * 1e6,
+        "ma_100_us": best_of(lambda: Indicators.ma(df_small), 200) * 1e6,
+        "rsi_100_us": best_of(lambda: Indicators.rsi(df_small), 200) * 1e6,
+        "macd_100k_ms": best_of(lambda: Indicators.macd(df_large), 5) * 1e3,
+        "streaming_macd_ns": streaming * 1e9,
+        "vectorized_macd_1m_ms": best_of(lambda: vectorized.macd(series), 3) * 1e3,
+    }
+
+
+# -----------------------------
+# 基线
+# -----------------------------
+def flatten(pipeline, paced, micro):
+    stage = lambda name, key: paced["stages"].get(name, {}).get(key, 0.0)
+    metrics = {
+        "pipeline.msgs_per_sec": pipeline["msgs_per_sec"],
+        "pipeline.dropped": pipeline["dropped"],
+        "paced.dropped": paced["dropped"],
+        "paced.tick_to_ack_p50_ms": stage("order.tick_to_ack", "p50") / 1000,
+        "paced.tick_to_ack_p99_ms": stage("order.tick_to_ack", "p99") / 1000,
+        "paced.ws_decode_p99_us": stage("ws.decode", "p99"),
+        "paced.bus_queue_p99_us": stage("bus.queue", "p99"),
+    }
+    metrics.update({"micro." + k: v for k, v in micro.items()})
+    return metrics
+
+
+def save_baseline(path, metrics, config):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"created": int(time.time()), "python": sys.version.split()[0],
+                   "machine": platform.platform(), "config": config, "metrics": metrics}, f, indent=2)
+
+
+def compare(metrics, baseline, tolerance):
+    """:return: 回退的指标列表 [(名称, 基线, 当前)]"""
+    regressions = []
+    for name, base in baseline["metrics"].items():
+        if name not in metrics:
+            continue
+        value = metrics[name]
+        if DIRECTIONS.get(name, "lower") == "higher":
+            worse = value < base * (1 - tolerance)
+        else:
+            worse = value > base * (1 + tolerance) if base > 0 else value > 0
+        if worse:
+            regressions.append((name, base, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="延迟与吞吐基准")
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--rate", type=int, default=2000, help="按速率推送时每秒帧数")
+    parser.add_argument("--rest-latency", type=float, default=0.005, help="假 REST 每个请求的延迟（秒）")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="相对基线允许的变化比例")
+    args = parser.parse_args()
+
+    log.configure(console=False)
+    frames = synthetic_frames(args.frames)
+    pipeline = run_pipeline(frames, 0, args.rest_latency)
+    paced = run_pipeline(frames[:max(1, args.rate * 5)], args.rate, args.rest_latency)
+    micro = run_micro()
+    metrics = flatten(pipeline, paced, micro)
+
+    print(f"不限速: 发送 {pipeline['sent']}，送达 {pipeline['delivered']}，丢弃 {pipeline['dropped']}，"
+          f"{pipeline['msgs_per_sec']:,.0f} msg/s，下单 {pipeline['orders']} 次")
+    print(f"{args.rate}/s: 发送 {paced['sent']}，送达 {paced['delivered']}，丢弃 {paced['dropped']}，下单 {paced['orders']} 次")
+    for name, summary in paced["stages"].items():
+        if summary.get("count"):
+            print(f"  {name:<20} n={summary['count']:<7} p50={summary['p50']:9.1f}us "
+                  f"p99={summary['p99']:9.1f}us p99.9={summary['p99.9']:9.1f}us")
+    for name, value in micro.items():
+        print(f"  {name:<24} {value:12.2f}")
+
+    config = {"frames": args.frames, "rate": args.rate, "rest_latency": args.rest_latency}
+    if args.save:
+        save_baseline(args.baseline, metrics, config)
+        print(f"基线已保存: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"没有基线（{args.baseline}），用 --save 保存")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        print(f"⚠️ 基线参数 {baseline.get('config')} 与本次 {config} 不同，对比仅供参考")
+    regressions = compare(metrics, baseline, args.tolerance)
+    for name, base, value in regressions:
+        print(f"❌ 回退 {name}: 基线 {base:.2f} → {value:.2f}")
+    if not regressions:
+        print(f"✅ 与基线相比无回退（容差 {args.tolerance:.0%}）")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+# 单个合约最大持仓名义价值（USDT）
+MAX_SYMBOL_NOTIONAL = 5000
+
+# 全账户最大持仓名义价值（USDT）
+MAX_ACCOUNT_NOTIONAL = 20000
+
+# 每秒最多下单次数
+MAX_ORDER_RATE = 5
+
+# 当日最大亏损（USDT），超过后只允许平仓
+MAX_DAILY_LOSS = 100
+
+# 下单价格与 WS 最新价的最大偏离比例
+PRICE_BAND = 0.01
+
+# WS 最新价超过该秒数未更新视为行情中断，不再开仓
+PRICE_MAX_AGE = 30
@@ -0,0 +1,18 @@
+# MACD 参数
+MACD_SHORT = 12
+
+MACD_LONG = 26
+
+MACD_SIGNAL = 9
+
+# 滑动窗口K线数
+WINDOW_SIZE = 100
+
+# 开仓保证金占可用余额比例（available / 4）
+POSITION_FRACTION = 0.25
+
+# 杠杆倍数
+LEVERAGE = 20
+
+# 可用余额低于该值不下单
+MIN_AVAILABLE = 10
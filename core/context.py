@@ -0,0 +1,134 @@
+import threading
+import time
+from core.event_bus import event_bus as default_event_bus
+from log.logger import get_logger
+
+logger = get_logger("account")
+
+# 订单终态：收到后从未成交委托中移除
+ORDER_DONE_STATES = {"filled", "canceled", "cancelled"}
+
+
+class AccountContext:
+    """
+    内存中的账户状态：余额、持仓、未成交委托
+    - 由私有 WS 的 account / positions / orders 推送增量维护，读取 O(1)，不走 REST
+    - 私有 WS 登录成功（首次连接与每次重连）后用 REST 全量对账一次，补上断线期间的变化
+    - 推送在事件分发线程处理，读取可能来自任意线程，统一用一把锁保护
+    """
+
+    def __init__(self, adapter_api=None, productType="USDT-FUTURES", marginCoin="USDT", event_bus=None):
+        self.adapter_api = adapter_api
+        self.productType = productType
+        self.marginCoin = marginCoin
+        self.event_bus = event_bus or default_event_bus
+        self._lock = threading.Lock()
+        self.balances = {}      # marginCoin -> 账户字段
+        self.positions = {}     # (symbol, holdSide) -> 持仓字段
+        self.orders = {}        # orderId -> 未成交委托字段
+        self.synced = False     # 是否已用 REST 全量对账过
+        self.synced_at = None
+        self.updated_at = None
+
+        self.event_bus.on("private.account", self.on_account)
+        self.event_bus.on("private.positions", self.on_positions)
+        self.event_bus.on("private.orders", self.on_orders)
+        self.event_bus.on("system.ws_logged_in", self.on_logged_in)
+
+    # -----------------------------
+    # 读取
+    # -----------------------------
+    def available(self, marginCoin=None):
+        """可用余额，没有记录时为 0"""
+        with self._lock:
+            account = self.balances.get(marginCoin or self.marginCoin)
+        return float(account["available"]) if account else 0.0
+
+    def position(self, symbol, holdSide=None):
+        """
+        单个合约的持仓字段（total 为 0 的不算持仓）
+        holdSide 不传时返回任一方向的持仓（单向持仓模式下至多一个），没有时返回 None
+        """
+        with self._lock:
+            if holdSide is not None:
+                return self.positions.get((symbol, holdSide))
+            return self.positions.get((symbol, "long")) or self.positions.get((symbol, "short"))
+
+    def all_positions(self):
+        with self._lock:
+            return list(self.positions.values())
+
+    def open_orders(self, symbol=None):
+        with self._lock:
+            return [o for o in self.orders.values() if symbol is None or _symbol(o) == symbol]
+
+    # -----------------------------
+    # 私有 WS 推送
+    # -----------------------------
+    def on_account(self, data, action=None):
+        with self._lock:
+            for account in data:
+                self.balances[account["marginCoin"]] = account
+            self.updated_at = time.monotonic()
+
+    def on_positions(self, data, action=None):
+        """positions 频道每次推送全部持仓（snapshot），平仓后对应条目消失"""
+        with self._lock:
+            if action == "snapshot":
+                self.positions = {}
+            for position in data:
+                key = (_symbol(position), position["holdSide"])
+                if float(position.get("total") or 0) == 0:
+                    self.positions.pop(key, None)
+                else:
+                    self.positions[key] = position
+            self.updated_at = time.monotonic()
+
+    def on_orders(self, data, action=None):
+        with self._lock:
+            for order in data:
+                if order.get("status") in ORDER_DONE_STATES:
+                    self.orders.pop(order["orderId"], None)
+                else:
+                    self.orders[order["orderId"]] = order
+            self.updated_at = time.monotonic()
+
+    def on_logged_in(self, info=None):
+        # 对账走 REST，放到线程池执行，不占用事件分发线程
+        if self.adapter_api is not None:
+            self.adapter_api.submit(self._resync_logged)
+
+    # -----------------------------
+    # REST 对账
+    # -----------------------------
+    def resync(self):
+        """用 REST 全量刷新余额、持仓和未成交委托"""
+        account, positions, orders = self.adapter_api.gather(
+            (self.adapter_api.get_account, self.productType),
+            (self.adapter_api.get_all_positions, self.productType, self.marginCoin),
+            (self.adapter_api.get_pending_orders, self.productType),
+        )
+        for resp in (account, positions, orders):
+            if resp.get("code") not in (None, "00000"):
+                raise RuntimeError(f"账户对账失败: {resp}")
+        entrusted = (orders.get("data") or {}).get("entrustedList") or []
+        with self._lock:
+            self.balances = {a["marginCoin"]: a for a in account.get("data") or []}
+            self.positions = {(_symbol(p), p["holdSide"]): p for p in positions.get("data") or []
+                              if float(p.get("total") or 0) != 0}
+            self.orders = {o["orderId"]: o for o in entrusted}
+            self.synced = True
+            self.synced_at = self.updated_at = time.monotonic()
+
+    def _resync_logged(self):
+        try:
+            self.resync()
+            logger.info("账户状态已同步", positions=len(self.positions), orders=len(self.orders))
+            self.event_bus.publish("account.synced", self)
+        except Exception as e:
+            logger.error("⚠️ 账户对账失败", error=e)
+
+
+def _symbol(item):
+    # WS 推送用 instId，REST 返回用 symbol
+    return item.get("instId") or item.get("symbol")
@@ -1,31 +1,356 @@
 import asyncio
-from collections import defaultdict
+import threading
+import time
+from collections import defaultdict, deque
+from core.latency import latency
+from log.logger import get_logger
+
+logger = get_logger("event_bus")
+
+# 队列满时的处理策略
+# drop_oldest: 丢弃最早的事件
+# coalesce:    相同 coalesce_key 的事件在队列中合并为最新一条；仍然满时丢弃最早的事件
+# block:       发布线程等待，直到队列有空位
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "block")
+
+# 分发线程每次加锁最多取出的事件数
+DISPATCH_BATCH = 64
+
+
+def _match(segments, topic_segments):
+    """主题匹配：* 匹配一段，# 匹配剩余的零段或多段（只能放在最后）"""
+    for i, seg in enumerate(segments):
+        if seg == "#":
+            return True
+        if i >= len(topic_segments):
+            return False
+        if seg != "*" and seg != topic_segments[i]:
+            return False
+    return len(segments) == len(topic_segments)
+
 
 class EventBus:
-    def __init__(self):
+    """
+    事件总线
+    - on/off/emit：在事件循环内直接订阅与触发
+      主题按 "." 分层，订阅时可用通配符，例如 "market.*.BTCUSDT"、"market.#"
+      handler 是否为协程在订阅时判定；主题到 handler 的路由按主题缓存，订阅变化时失效
+    - publish：线程安全，供 WS 等外部线程投递事件
+      事件进入有界队列，由一个常驻线程上的事件循环统一分发，
+      不再为每条消息创建/销毁事件循环，也不会阻塞 WS 读线程（block 策略除外）
+    """
+
+    def __init__(self, maxsize=10000, overflow="drop_oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的队列溢出策略: {overflow}")
+        # 订阅：pattern -> [(handler, is_coroutine)]
         self._handlers = defaultdict(list)
+        self._wildcards = {}     # 含通配符的 pattern -> 分段
+        self._routes = {}        # 主题 -> 匹配到的 handler 元组（路由缓存）
+        self._latest_patterns = {}
+        self._latest = {}        # 主题 -> 是否“只保留最新值”（缓存）
+        self.maxsize = maxsize
+        self.overflow = overflow
+
+        # 有界队列，元素为 [event_name, args, kwargs, coalesce_key, publish 时间 ns, 源头时间 ns]（延迟统计关闭时均为 0）
+        self._queue = deque()
+        self._keyed = {}
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+        # 常驻事件循环
+        self._loop = None
+        self._thread = None
+        self._wakeup = None
+        self._sleeping = False
+        self._running = False
+
+        # 统计
+        self.published = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._handler_stats = {}
+        self._rate_mark = (time.monotonic(), 0)
+        self.current_published_ns = 0   # 正在分发的事件的 publish 时间（仅延迟统计开启时）
+        self.current_received_ns = 0    # 正在分发的事件的源头时间（WS 收到帧的时间，未提供时同 publish 时间）
 
     def on(self, event_name, handler):
-        """订阅事件"""
-        self._handlers[event_name].append(handler)
+        """订阅事件，event_name 可以包含通配符"""
+        self._handlers[event_name].append((handler, asyncio.iscoroutinefunction(handler)))
+        if "*" in event_name or "#" in event_name:
+            self._wildcards[event_name] = event_name.split(".")
+        self._routes = {}
 
     def off(self, event_name, handler):
         """取消订阅"""
-        self._handlers[event_name].remove(handler)
+        entries = self._handlers[event_name]
+        for i, (h, _) in enumerate(entries):
+            if h == handler:
+                del entries[i]
+                break
+        else:
+            raise ValueError(f"{handler} 未订阅 {event_name}")
+        if not entries:
+            del self._handlers[event_name]
+            self._wildcards.pop(event_name, None)
+        self._routes = {}
+
+    def _resolve(self, event_name):
+        """计算某个主题匹配的全部 handler，并写入路由缓存"""
+        entries = list(self._handlers.get(event_name, ()))
+        if self._wildcards:
+            topic_segments = event_name.split(".")
+            for pattern, segments in self._wildcards.items():
+                if _match(segments, topic_segments):
+                    entries.extend(self._handlers[pattern])
+        route = tuple(entries)
+        self._routes[event_name] = route
+        return route
 
     async def emit(self, event_name, *args, **kwargs):
-        """异步触发事件"""
-        if event_name not in self._handlers:
+        """
+        异步触发事件
+        同步 handler 依次直接调用；协程 handler 并发执行
+        """
+        route = self._routes.get(event_name)
+        if route is None:
+            route = self._resolve(event_name)
+        if not route:
             return
-        for handler in self._handlers[event_name]:
+        coroutines = None
+        for handler, is_coroutine in route:
+            if is_coroutine:
+                if coroutines is None:
+                    coroutines = []
+                coroutines.append(self._run_coroutine(event_name, handler, args, kwargs))
+                continue
+            start = time.perf_counter()
             try:
-                if asyncio.iscoroutinefunction(handler):
-                    await handler(*args, **kwargs)
-                else:
-                    handler(*args, **kwargs)
+                handler(*args, **kwargs)
             except Exception as e:
-                print(f"[EventBus] 事件 {event_name} 执行错误:", e)
+                logger.error("事件执行错误", event=event_name, error=e)
+            self._record_handler(handler, time.perf_counter() - start)
+        if coroutines is not None:
+            if len(coroutines) == 1:
+                await coroutines[0]
+            else:
+                await asyncio.gather(*coroutines)
+
+    def dispatch(self, event_name, *args, **kwargs):
+        """
+        在调用线程同步分发（不经过队列），用于回放等单线程场景
+        有协程 handler 时用 asyncio.run 执行，因此不能在事件循环内调用
+        """
+        route = self._routes.get(event_name)
+        if route is None:
+            route = self._resolve(event_name)
+        if any(is_coroutine for _, is_coroutine in route):
+            asyncio.run(self.emit(event_name, *args, **kwargs))
+            return
+        for handler, _ in route:
+            start = time.perf_counter()
+            try:
+                handler(*args, **kwargs)
+            except Exception as e:
+                logger.error("事件执行错误", event=event_name, error=e)
+            self._record_handler(handler, time.perf_counter() - start)
+
+    async def _run_coroutine(self, event_name, handler, args, kwargs):
+        start = time.perf_counter()
+        try:
+            await handler(*args, **kwargs)
+        except Exception as e:
+            logger.error("事件执行错误", event=event_name, error=e)
+        self._record_handler(handler, time.perf_counter() - start)
+
+    # -----------------------------
+    # “只保留最新值”主题
+    # -----------------------------
+    def set_latest_only(self, pattern, enabled=True):
+        """
+        按主题开启“最新值优先”：publish 到匹配主题的事件在队列中按主题合并，
+        消费慢时只会看到最新的一条（K线/ticker），不会处理积压
+        """
+        if enabled:
+            self._latest_patterns[pattern] = pattern.split(".")
+        else:
+            self._latest_patterns.pop(pattern, None)
+        self._latest = {}
+
+    def _is_latest(self, event_name):
+        latest = self._latest.get(event_name)
+        if latest is None:
+            topic_segments = event_name.split(".")
+            latest = any(_match(segments, topic_segments) for segments in self._latest_patterns.values())
+            self._latest[event_name] = latest
+        return latest
+
+    # -----------------------------
+    # 常驻事件循环
+    # -----------------------------
+    def start(self):
+        """启动分发线程（重复调用无副作用）"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="event-bus", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self, timeout=5):
+        """停止分发线程，队列中剩余事件会先分发完"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._not_full.notify_all()
+            wake = self._sleeping
+            self._sleeping = False
+        if wake:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        self._thread.join(timeout)
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        ready.set()
+        try:
+            self._loop.run_until_complete(self._dispatch_loop())
+        finally:
+            self._loop.close()
+
+    async def _dispatch_loop(self):
+        while True:
+            with self._lock:
+                batch = []
+                while self._queue and len(batch) < DISPATCH_BATCH:
+                    item = self._queue.popleft()
+                    if item[3] is not None and self._keyed.get(item[3]) is item:
+                        del self._keyed[item[3]]
+                    batch.append(item)
+                if batch:
+                    self._not_full.notify_all()
+                elif not self._running:
+                    return
+                else:
+                    self._sleeping = True
+                    self._wakeup.clear()
+            if not batch:
+                await self._wakeup.wait()
+                continue
+            for event_name, args, kwargs, _, published_ns, received_ns in batch:
+                if not published_ns:
+                    await self.emit(event_name, *args, **kwargs)
+                    continue
+                # 延迟统计开启时：排队时间与 handler 执行时间；handler 可读取 current_published_ns
+                start = time.perf_counter_ns()
+                latency.record("bus.queue", start - published_ns)
+                self.current_published_ns = published_ns
+                self.current_received_ns = received_ns or published_ns
+                await self.emit(event_name, *args, **kwargs)
+                self.current_published_ns = self.current_received_ns = 0
+                latency.record("bus.dispatch", time.perf_counter_ns() - start)
+            self.dispatched += len(batch)
+
+    # -----------------------------
+    # 线程安全投递
+    # -----------------------------
+    def publish(self, event_name, *args, coalesce_key=None, received_ns=0, **kwargs):
+        """
+        从任意线程投递事件，由分发线程异步执行
+        :param coalesce_key: overflow="coalesce" 时，队列中相同 key 的事件只保留最新一条
+                             set_latest_only 的主题总是按主题名合并，忽略该参数
+        :param received_ns: 事件源头的 perf_counter_ns（如 WS 收到帧的时间），分发时通过 current_received_ns 读取
+        :return: 事件是否进入队列（合并也视为成功）
+        """
+        if not self._running:
+            self.start()
+        if self._latest_patterns and self._is_latest(event_name):
+            coalesce_key = event_name
+            keyed = True
+        else:
+            keyed = coalesce_key is not None and self.overflow == "coalesce"
+        with self._lock:
+            self.published += 1
+            if keyed:
+                item = self._keyed.get(coalesce_key)
+                if item is not None:
+                    item[1] = args
+                    item[2] = kwargs
+                    if received_ns:
+                        item[5] = received_ns
+                    self.coalesced += 1
+                    return True
+            if len(self._queue) >= self.maxsize:
+                # 分发线程自己投递时不能等待，否则会死锁
+                if self.overflow == "block" and threading.current_thread() is not self._thread:
+                    while len(self._queue) >= self.maxsize and self._running:
+                        self._not_full.wait()
+                else:
+                    old = self._queue.popleft()
+                    if old[3] is not None and self._keyed.get(old[3]) is old:
+                        del self._keyed[old[3]]
+                    self.dropped += 1
+            item = [event_name, args, kwargs, coalesce_key if keyed else None,
+                    time.perf_counter_ns() if latency.enabled else 0, received_ns]
+            self._queue.append(item)
+            if keyed:
+                self._keyed[coalesce_key] = item
+            wake = self._sleeping
+            self._sleeping = False
+        if wake:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    # -----------------------------
+    # 统计
+    # -----------------------------
+    def _record_handler(self, handler, elapsed):
+        name = getattr(handler, "__qualname__", repr(handler))
+        stat = self._handler_stats.get(name)
+        if stat is None:
+            stat = self._handler_stats[name] = [0, 0.0, 0.0]
+        stat[0] += 1
+        stat[1] += elapsed
+        if elapsed > stat[2]:
+            stat[2] = elapsed
+
+    def stats(self):
+        """
+        返回队列深度、吞吐和各 handler 耗时
+        events_per_sec 为距上次调用 stats() 以来的分发速率
+        """
+        now = time.monotonic()
+        last_time, last_count = self._rate_mark
+        dispatched = self.dispatched
+        self._rate_mark = (now, dispatched)
+        elapsed = now - last_time
+        handlers = {}
+        for name, (count, total, worst) in list(self._handler_stats.items()):
+            handlers[name] = {
+                "count": count,
+                "total_ms": total * 1000,
+                "avg_us": total / count * 1e6 if count else 0.0,
+                "max_us": worst * 1e6,
+            }
+        return {
+            "depth": len(self._queue),
+            "published": self.published,
+            "dispatched": dispatched,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "events_per_sec": (dispatched - last_count) / elapsed if elapsed > 0 else 0.0,
+            "handlers": handlers,
+        }
 
 
 # 创建一个全局事件总线实例（可在任何模块导入）
-event_bus = EventBus()
\ No newline at end of file
+event_bus = EventBus()
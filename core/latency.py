@@ -0,0 +1,192 @@
+"""
+链路延迟统计
+- 各阶段耗时写入 HDR 风格的对数-线性直方图：每个 2 的幂区间再分 32 格，相对误差约 3%，
+  1ns ~ 68s 的范围固定约 1000 个计数格，内存不随样本数增长
+- REST 按接口路径统计耗时、请求数和错误数
+- 默认关闭：埋点处只判断一次 latency.enabled，不取时间戳
+- snapshot() 读取；start_dump() 定时写日志；install_signal() 收到 SIGUSR1 时写日志
+
+阶段（单位 ns，统一用 time.perf_counter_ns）：
+    ws.decode            WS 帧进入 _on_message 到解码完成
+    ws.downtime          连接断开到重连并补齐缺失K线
+    shm.read             行情进程 WS 收帧（无收帧时间时为写入共享内存）到策略进程从环形缓冲读出
+    bus.queue            publish 到分发线程开始处理（排队时间）
+    bus.dispatch         一个事件所有 handler 的执行时间
+    strategy.indicator   K线写入滑动窗口 + MACD 更新 + 信号计算
+    strategy.decision    状态机判断并提交下单意图
+    order.queue          意图提交到工作线程开始执行
+    order.tick_to_ack    触发下单的行情帧 WS 收到（_on_message 入口）到交易所受理
+    rest.wait            限频排队
+    rest.request         HTTP 请求发出到收到响应（另按接口路径分别统计）
+"""
+import signal
+import threading
+from log.logger import get_logger
+
+logger = get_logger("latency")
+
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+MAX_VALUE = (1 << 36) - 1   # 约 68.7 秒，超出的计入最后一格
+
+
+def _index(value):
+    if value < 2 * SUB_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return (shift + 1) * SUB_COUNT + (value >> shift) - SUB_COUNT
+
+
+def _lower_bound(index):
+    if index < 2 * SUB_COUNT:
+        return index
+    shift = index // SUB_COUNT - 1
+    return (index % SUB_COUNT + SUB_COUNT) << shift
+
+
+BUCKETS = _index(MAX_VALUE) + 1
+
+
+class Histogram:
+    """
+    对数-线性直方图（固定内存）
+    多线程写入时计数在 GIL 下可能偶有丢失，用于统计足够
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        if value < 0:
+            value = 0
+        elif value > MAX_VALUE:
+            value = MAX_VALUE
+        self.counts[_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def percentile(self, q):
+        """q 取 0~100；返回所在格的下界与上界的中点"""
+        if self.count == 0:
+            return 0
+        target = max(1, int(self.count * q / 100 + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                low = _lower_bound(index)
+                high = _lower_bound(index + 1) - 1
+                return min((low + high) // 2, self.max)
+        return self.max
+
+    def summary(self, unit=1000):
+        """:param unit: 换算单位，默认输出微秒"""
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.total / self.count / unit,
+            "p50": self.percentile(50) / unit,
+            "p99": self.percentile(99) / unit,
+            "p99.9": self.percentile(99.9) / unit,
+            "min": self.min / unit,
+            "max": self.max / unit,
+        }
+
+
+class LatencyStats:
+    """各阶段延迟直方图 + REST 按接口统计"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.rest = {}      # path -> [Histogram, 请求数, 错误数]
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def record(self, stage, elapsed_ns):
+        hist = self.stages.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(stage, Histogram())
+        hist.record(elapsed_ns)
+
+    def record_rest(self, path, elapsed_ns, ok=True):
+        entry = self.rest.get(path)
+        if entry is None:
+            with self._lock:
+                entry = self.rest.setdefault(path, [Histogram(), 0, 0])
+        entry[0].record(elapsed_ns)
+        entry[1] += 1
+        if not ok:
+            entry[2] += 1
+        self.record("rest.request", elapsed_ns)
+
+    def snapshot(self):
+        """
+        :return: {"stages": {阶段: 微秒统计}, "rest": {路径: 毫秒统计 + requests/errors}}
+        """
+        with self._lock:
+            stages = dict(self.stages)
+            rest = dict(self.rest)
+        result = {"stages": {name: hist.summary() for name, hist in sorted(stages.items())}, "rest": {}}
+        for path, (hist, requests, errors) in sorted(rest.items()):
+            summary = hist.summary(unit=1_000_000)
+            summary.update(requests=requests, errors=errors)
+            result["rest"][path] = summary
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.rest = {}
+
+    # -----------------------------
+    # 输出
+    # -----------------------------
+    def dump(self):
+        logger.info("延迟统计", **self.snapshot())
+
+    def start_dump(self, interval=60):
+        """后台线程每 interval 秒写一次日志"""
+        if self._dump_thread is not None:
+            return
+        self._dump_stop.clear()
+
+        def run():
+            while not self._dump_stop.wait(interval):
+                self.dump()
+
+        self._dump_thread = threading.Thread(target=run, name="latency-dump", daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+    def install_signal(self):
+        """收到 SIGUSR1 时写一次日志（需在主线程调用，Windows 下没有该信号）"""
+        if not hasattr(signal, "SIGUSR1"):
+            return False
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump())
+        return True
+
+
+# 全局实例，默认关闭
+latency = LatencyStats()
@@ -0,0 +1,317 @@
+"""
+共享内存行情环形缓冲（单写多读）
+- 一个行情进程（一组 WS 连接）把解码后的K线/ticker 写入共享内存，多个策略进程各自读取，
+  不再每个进程各开一套行情连接，策略逻辑可以分布到多个 CPU 核
+- 单写者：只有行情进程的一个线程写入，不加锁；读者只读共享内存，不写任何状态，慢读者不会阻塞写者
+- 每条记录带全局序号，槽位用 seqlock 方式标记：写入前置为 2*seq+1，写完置为 2*seq+2
+  读者按自己的序号读取，读前读后两次检查标记，被覆盖（落后超过 capacity 条）时能发现并计数
+- 记录定长，读者用 struct.unpack_from 直接从共享内存解出数值，不经过 pickle/管道/队列
+
+布局（小端）：
+    头部    MAGIC(8) capacity(uint32) slot_size(uint32) write_seq(uint64) topic_count(uint32)，补齐到 64 字节
+    主题表  MAX_TOPICS 个 TOPIC_SIZE 字节的主题名（UTF-8，末尾补 0），记录中只存主题编号
+    槽位    capacity 个：标记(uint64) 源头时间 perf_counter_ns(int64) 主题编号(uint16) 类型(uint8) 标志(uint8)
+            行号(uint32，该行在本次推送中的下标) + 8 个 float64
+
+写入顺序依赖 CPU 不重排普通写（x86 满足）；源头时间为行情进程 WS 收到该帧的 perf_counter_ns（没有时取写入时间），
+Linux 下为系统级 CLOCK_MONOTONIC，跨进程可直接相减，策略进程据此得到从 WS 收帧起算的延迟
+"""
+import math
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from core.latency import latency
+from log.logger import get_logger
+
+logger = get_logger("shm")
+
+MAGIC = b"BGSHM02\n"
+HEADER = struct.Struct("<8sIIQI")
+HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16
+TOPIC_COUNT_OFFSET = 24
+MAX_TOPICS = 256
+TOPIC_SIZE = 64
+STAMP = struct.Struct("<Q")
+BODY = struct.Struct("<qHBBI8d")
+SLOT_SIZE = STAMP.size + BODY.size
+SLOTS_OFFSET = HEADER_SIZE + MAX_TOPICS * TOPIC_SIZE
+
+# 记录类型
+KIND_CANDLE = 1
+KIND_TICKER = 2
+
+# 标志：一次 publish 的多根K线（如断线补K线）拆成多条记录，最后一条带 FLAG_LAST，读者攒齐后一起投递
+# 每条记录另带行号，读者只攒从第 0 行开始且连续的推送：覆盖后从推送中间恢复读取时，残缺的后半截直接丢弃
+FLAG_LAST = 1
+
+# ticker 推送中保留的数值字段（缺失记为 nan），读者还原为同名键的 dict
+TICKER_FIELDS = ("ts", "lastPr", "bidPr", "askPr", "markPrice", "indexPrice", "fundingRate", "baseVolume")
+
+
+def _attach(name):
+    """
+    只读方挂载已存在的共享内存
+    Python 3.13 之前挂载也会登记到 resource_tracker，读者进程退出时会把写者的共享内存删掉，这里跳过登记
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+def _ticker_row(item):
+    row = []
+    for field in TICKER_FIELDS:
+        value = item.get(field)
+        row.append(float(value) if value not in (None, "") else math.nan)
+    return row
+
+
+class ShmRingWriter:
+    """
+    :param name: 共享内存名称，读者按名称挂载
+    :param capacity: 槽位数；读者落后超过该条数即发生覆盖
+    """
+
+    def __init__(self, name, capacity=65536):
+        self.name = name
+        self.capacity = capacity
+        self.shm = SharedMemory(name, create=True, size=SLOTS_OFFSET + capacity * SLOT_SIZE)
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, MAGIC, capacity, SLOT_SIZE, 0, 0)
+        self.seq = 0
+        self.topics = {}    # 主题 -> 编号
+
+    def topic_id(self, topic):
+        """登记主题（先写主题名，再增加主题数，读者看到的编号总是有名字）"""
+        tid = self.topics.get(topic)
+        if tid is None:
+            data = topic.encode("utf-8")
+            if len(data) > TOPIC_SIZE:
+                raise ValueError(f"主题名超过 {TOPIC_SIZE} 字节: {topic}")
+            tid = len(self.topics)
+            if tid >= MAX_TOPICS:
+                raise ValueError(f"主题数超过上限 {MAX_TOPICS}")
+            offset = HEADER_SIZE + tid * TOPIC_SIZE
+            self.buf[offset:offset + TOPIC_SIZE] = data.ljust(TOPIC_SIZE, b"\0")
+            struct.pack_into("<I", self.buf, TOPIC_COUNT_OFFSET, tid + 1)
+            self.topics[topic] = tid
+        return tid
+
+    def write(self, topic, kind, rows, received_ns=0):
+        """
+        写入一次推送（一行或多行），写完后才更新头部的 write_seq
+        :param rows: 每行最多 8 个数值
+        :param received_ns: WS 收到该帧的 perf_counter_ns，0 时用当前时间
+        """
+        tid = self.topic_id(topic)
+        buf = self.buf
+        now = received_ns or time.perf_counter_ns()
+        last = len(rows) - 1
+        seq = self.seq
+        for i, row in enumerate(rows):
+            offset = SLOTS_OFFSET + (seq % self.capacity) * SLOT_SIZE
+            STAMP.pack_into(buf, offset, 2 * seq + 1)
+            values = list(row[:8]) + [0.0] * (8 - len(row))
+            BODY.pack_into(buf, offset + STAMP.size, now, tid, kind, FLAG_LAST if i == last else 0, i, *values)
+            STAMP.pack_into(buf, offset, 2 * seq + 2)
+            seq += 1
+        self.seq = seq
+        STAMP.pack_into(buf, WRITE_SEQ_OFFSET, seq)
+
+    def write_candles(self, topic, candles, received_ns=0):
+        self.write(topic, KIND_CANDLE, candles, received_ns)
+
+    def write_ticker(self, topic, data, received_ns=0):
+        self.write(topic, KIND_TICKER, [_ticker_row(item) for item in data], received_ns)
+
+    def close(self):
+        """写者关闭时删除共享内存；已挂载的读者仍可读完已有数据"""
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class ShmRingReader:
+    """
+    :param name: 写者的共享内存名称
+    :param from_start: False 只读挂载之后的新记录；True 从环中仍保留的最早一条开始
+    """
+
+    def __init__(self, name, from_start=False):
+        self.name = name
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, capacity, slot_size, write_seq, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or slot_size != SLOT_SIZE:
+            self.close()
+            raise ValueError(f"不是行情环形缓冲或版本不一致: {name}")
+        self.capacity = capacity
+        self.seq = max(0, write_seq - capacity) if from_start else write_seq
+        self.topics = []
+        self._partial = {}      # 主题编号 -> 未攒齐的多行推送
+        self.overruns = 0       # 发生覆盖的次数
+        self.lost = 0           # 因覆盖丢失的记录数（含丢弃的残缺推送）
+        self.read = 0
+
+    def _topic(self, tid):
+        while tid >= len(self.topics):
+            offset = HEADER_SIZE + len(self.topics) * TOPIC_SIZE
+            self.topics.append(bytes(self.buf[offset:offset + TOPIC_SIZE]).rstrip(b"\0").decode("utf-8"))
+        return self.topics[tid]
+
+    def _overrun(self, stamp=0):
+        """
+        落后超过 capacity：跳到环中仍有效的位置，丢弃未攒齐的推送
+        :param stamp: 读到的槽位标记，由此得出写者至少已写到的序号（头部的 write_seq 要等整次推送写完才更新）
+        """
+        head = max(STAMP.unpack_from(self.buf, WRITE_SEQ_OFFSET)[0], (stamp - 1) // 2 + 1)
+        # 留出 1/8 环的余量，避免刚跳过去又被写者覆盖
+        resume = max(self.seq + 1, head - self.capacity + self.capacity // 8)
+        self.lost += resume - self.seq
+        self.overruns += 1
+        self.seq = resume
+        self._partial.clear()
+        logger.warning("⚠️ 行情读取落后被覆盖", ring=self.name, lost=self.lost, overruns=self.overruns)
+
+    def poll(self, max_records=4096):
+        """
+        读取已写完的新记录
+        :return: [(主题, 类型, 行列表, 源头时间 perf_counter_ns)]；
+                 K线行为 (startTime:int, open, high, low, close, vol1, vol2, vol3)，ticker 行为 {TICKER_FIELDS: float}
+        """
+        buf = self.buf
+        head = STAMP.unpack_from(buf, WRITE_SEQ_OFFSET)[0]
+        if head - self.seq > self.capacity:
+            self._overrun()
+        events = []
+        now = time.perf_counter_ns() if latency.enabled else 0
+        count = 0
+        while self.seq < head and count < max_records:
+            seq = self.seq
+            offset = SLOTS_OFFSET + (seq % self.capacity) * SLOT_SIZE
+            expected = 2 * seq + 2
+            stamp = STAMP.unpack_from(buf, offset)[0]
+            if stamp != expected:
+                self._overrun(stamp)
+                continue
+            written, tid, kind, flags, index, *values = BODY.unpack_from(buf, offset + STAMP.size)
+            stamp = STAMP.unpack_from(buf, offset)[0]
+            if stamp != expected:
+                # 读的过程中被写者覆盖
+                self._overrun(stamp)
+                continue
+            self.seq = seq + 1
+            count += 1
+            if kind == KIND_CANDLE:
+                values[0] = int(values[0])
+                row = tuple(values)
+            else:
+                row = dict(zip(TICKER_FIELDS, values))
+            if index == 0:
+                rows = [row]
+            else:
+                rows = self._partial.pop(tid, None)
+                if rows is None or len(rows) != index:
+                    # 推送的前几行已被覆盖（或在 _overrun 中丢弃），整次推送不投递
+                    self.lost += 1 + (len(rows) if rows else 0)
+                    continue
+                rows.append(row)
+            if flags & FLAG_LAST:
+                self._partial.pop(tid, None)
+                events.append((self._topic(tid), kind, rows, written))
+                if now:
+                    latency.record("shm.read", now - written)
+            else:
+                self._partial[tid] = rows
+        self.read += count
+        return events
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+# -----------------------------
+# 与事件总线对接
+# -----------------------------
+class ShmPublisher:
+    """
+    行情进程侧：把本进程事件总线上的 market.<channel>.<symbol> 推送写入环形缓冲
+    handler 都在事件总线的分发线程执行，满足单写者；源头时间取分发中事件的 current_received_ns
+    """
+
+    def __init__(self, writer, event_bus):
+        self.writer = writer
+        self.event_bus = event_bus
+        self._handlers = {}
+
+    def add(self, symbol, channel):
+        topic = f"market.{channel}.{symbol}"
+        if topic in self._handlers:
+            return topic
+        if channel.startswith("candle"):
+            handler = lambda candles: self.writer.write_candles(topic, candles, self.event_bus.current_received_ns)
+        elif channel == "ticker":
+            handler = lambda data: self.writer.write_ticker(topic, data, self.event_bus.current_received_ns)
+        else:
+            raise ValueError(f"环形缓冲不支持的频道: {channel}")
+        # 先登记主题，读者启动时即可解析全部主题名
+        self.writer.topic_id(topic)
+        self.event_bus.on(topic, handler)
+        self._handlers[topic] = handler
+        return topic
+
+    def close(self):
+        for topic, handler in self._handlers.items():
+            self.event_bus.off(topic, handler)
+        self._handlers = {}
+
+
+class ShmSubscriber:
+    """
+    策略进程侧：后台线程轮询环形缓冲，把记录按原主题投递到本进程的事件总线，
+    Strategy / RiskEngine 等订阅方式与直连 WS 时相同；投递时带上行情进程 WS 收帧时间，
+    下单延迟（tick_ns）与直连 WS 时一样从收帧起算
+    :param poll_interval: 没有新记录时的休眠秒数；0 表示忙轮询（独占一个核，延迟最低）
+    """
+
+    def __init__(self, name, event_bus, poll_interval=0.0005, from_start=False):
+        self.reader = ShmRingReader(name, from_start)
+        self.event_bus = event_bus
+        self.poll_interval = poll_interval
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="shm-subscriber", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        reader = self.reader
+        publish = self.event_bus.publish
+        while self._running:
+            events = reader.poll()
+            if not events:
+                time.sleep(self.poll_interval)
+                continue
+            for topic, kind, rows, received_ns in events:
+                # 与 WS 入口一致：单根K线按 startTime 合并
+                coalesce_key = (topic, rows[0][0]) if kind == KIND_CANDLE and len(rows) == 1 else None
+                publish(topic, rows, coalesce_key=coalesce_key, received_ns=received_ns)
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        self.reader.close()
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# 与 Bitget WS candle 推送顺序一致
+COLUMNS = ("startTime", "open", "high", "low", "close", "vol1", "vol2", "vol3")
+COLUMN_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+
+
+class CandleStore:
+    """
+    定长列式K线窗口（NumPy 环形缓冲）
+    - 以 startTime 为键原地 upsert：同一根K线的重复推送直接覆盖，不会产生重复行
+    - 底层数组长度为 2 * capacity，每行同时写入 slot 和 slot + capacity，
+      因此最近 N 根K线总是一段连续内存，指标可以直接拿零拷贝视图
+    - 稳态更新只做标量写入，不分配新数组
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._data = np.full((len(COLUMNS), 2 * capacity), np.nan)
+        self._row = np.empty(len(COLUMNS))  # 解析用的临时行，复用
+        self._head = 0        # 下一根新K线写入的 slot
+        self._size = 0
+        self.last_time = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def empty(self):
+        return self._size == 0
+
+    def _write(self, slot):
+        cap = self.capacity
+        self._data[:, slot] = self._row
+        self._data[:, slot + cap] = self._row
+
+    def upsert(self, row):
+        """
+        写入一根K线
+        :param row: [startTime, open, high, low, close, vol1, vol2, vol3]（字符串或数值均可）
+        :return: True 表示已写入；False 表示早于窗口或不在窗口中的旧K线，被忽略
+        """
+        self._row[:] = row
+        start_time = int(self._row[0])
+        cap = self.capacity
+
+        if self.last_time is None or start_time > self.last_time:
+            self._write(self._head)
+            self._head = (self._head + 1) % cap
+            if self._size < cap:
+                self._size += 1
+            self.last_time = start_time
+            return True
+
+        if start_time == self.last_time:
+            self._write((self._head - 1) % cap)
+            return True
+
+        # 修正窗口内更早的K线
+        times = self.column("startTime")
+        idx = int(np.searchsorted(times, start_time))
+        if idx < self._size and times[idx] == start_time:
+            self._write((self._head - self._size + idx) % cap)
+            return True
+        return False
+
+    def extend(self, rows):
+        for row in rows:
+            self.upsert(row)
+
+    def clear(self):
+        self._data.fill(np.nan)
+        self._head = 0
+        self._size = 0
+        self.last_time = None
+
+    # -----------------------------
+    # 零拷贝视图
+    # -----------------------------
+    def column(self, name):
+        """返回某一列最近 len(self) 个值的只读视图（按时间升序）"""
+        end = self._head + self.capacity
+        view = self._data[COLUMN_INDEX[name], end - self._size:end]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def close(self):
+        return self.column("close")
+
+    def values(self):
+        """返回 (列数, len(self)) 的只读二维视图"""
+        end = self._head + self.capacity
+        view = self._data[:, end - self._size:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self, name="close"):
+        return self._data[COLUMN_INDEX[name], (self._head - 1) % self.capacity]
+
+    def to_frame(self):
+        """拷贝为 DataFrame，兼容 Indicators 的 DataFrame 接口"""
+        return pd.DataFrame(self.values().T.copy(), columns=COLUMNS)
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dataProcess.candle_store import COLUMNS
+from dataProcess.kline_builder import interval_ms
+from ws.bitget.bitget_decode import decode_candles
+
+# 每页最大条数：candles 接口 1000，history-candles 接口 200
+PAGE_LIMIT = {"candles": 1000, "history": 200}
+
+# Bitget 行情接口限频 20 次/秒/IP，留一点余量
+REQUESTS_PER_SECOND = 18
+
+# 列文件的数据类型：startTime 为 int64，其余为 float64
+COLUMN_DTYPES = {name: (np.int64 if name == "startTime" else np.float64) for name in COLUMNS}
+
+
+class CandleCache:
+    """
+    本地列式K线缓存
+    - 每个 productType/symbol/granularity 一个目录，每列一个原始二进制文件，只追加写
+    - 读取时用 np.memmap 映射，多年数据也是零拷贝加载，不需要解析 JSON
+    - 各列文件长度不一致（写入中断）时按最短的一列截断
+    """
+
+    def __init__(self, root, symbol, productType, granularity):
+        self.path = os.path.join(root, productType, symbol, granularity)
+
+    def _file(self, name):
+        return os.path.join(self.path, name + ".bin")
+
+    def __len__(self):
+        sizes = []
+        for name in COLUMNS:
+            try:
+                sizes.append(os.path.getsize(self._file(name)) // 8)
+            except FileNotFoundError:
+                return 0
+        return min(sizes)
+
+    def load(self):
+        """返回 {列名: 只读 memmap}，没有缓存时返回空数组"""
+        n = len(self)
+        columns = {}
+        for name in COLUMNS:
+            if n == 0:
+                columns[name] = np.zeros(0, dtype=COLUMN_DTYPES[name])
+            else:
+                columns[name] = np.memmap(self._file(name), dtype=COLUMN_DTYPES[name], mode="r", shape=(n,))
+        return columns
+
+    def time_range(self):
+        """缓存覆盖的 (首根 startTime, 末根 startTime)，为空时返回 None"""
+        n = len(self)
+        if n == 0:
+            return None
+        times = np.memmap(self._file("startTime"), dtype=np.int64, mode="r", shape=(n,))
+        return int(times[0]), int(times[-1])
+
+    def append(self, rows):
+        """追加 (m, 8) 数组（按 startTime 升序，且晚于已有数据）"""
+        if len(rows) == 0:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        n = len(self)
+        for i, name in enumerate(COLUMNS):
+            with open(self._file(name), "r+b" if os.path.exists(self._file(name)) else "wb") as f:
+                # 先截掉中断写入留下的多余部分，保证各列对齐
+                f.truncate(n * 8)
+                f.seek(n * 8)
+                f.write(rows[:, i].astype(COLUMN_DTYPES[name]).tobytes())
+
+    def rewrite(self, rows):
+        """整体重写（只在需要往前补历史时使用）"""
+        os.makedirs(self.path, exist_ok=True)
+        for i, name in enumerate(COLUMNS):
+            tmp = self._file(name) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(rows[:, i].astype(COLUMN_DTYPES[name]).tobytes())
+            os.replace(tmp, self._file(name))
+
+
+class CandleDownloader:
+    """
+    历史K线下载器
+    - 把 [start, end] 按每页最大条数切分，线程池并发拉取，受每秒请求数限制
+    - 按 startTime 去重排序后写入 CandleCache，之后只补缺失的头尾
+    """
+
+    def __init__(self, adapter_api, cache_root="data/candles", max_workers=4,
+                 rate=REQUESTS_PER_SECOND, endpoint="candles"):
+        if endpoint not in PAGE_LIMIT:
+            raise ValueError(f"未知的K线接口: {endpoint}")
+        self.adapter_api = adapter_api
+        self.cache_root = cache_root
+        self.max_workers = max_workers
+        self.endpoint = endpoint
+        self._interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._rate_lock = threading.Lock()
+
+    def _throttle(self):
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def _fetch_page(self, symbol, productType, granularity, start, end):
+        self._throttle()
+        limit = PAGE_LIMIT[self.endpoint]
+        if self.endpoint == "history":
+            resp = self.adapter_api.get_history_kline(symbol, productType, granularity, start, end, limit)
+        else:
+            resp = self.adapter_api.get_kline(symbol, productType, granularity, start, end, None, limit)
+        if resp.get("code") not in (None, "00000"):
+            raise RuntimeError(f"K线下载失败 {symbol} {granularity} [{start}, {end}]: {resp}")
+        return decode_candles(resp.get("data") or [])
+
+    def fetch(self, symbol, productType, granularity, start, end):
+        """
+        并发下载 [start, end]（毫秒）内的K线
+        :return: (n, 8) float64 数组，列顺序同 COLUMNS，按 startTime 升序去重
+        """
+        ms = interval_ms(granularity)
+        start -= start % ms
+        page_span = PAGE_LIMIT[self.endpoint] * ms
+        pages = [(s, min(s + page_span - ms, end)) for s in range(start, end + 1, page_span)]
+        if not pages:
+            return np.zeros((0, len(COLUMNS)))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(lambda p: self._fetch_page(symbol, productType, granularity, p[0], p[1]), pages))
+        rows = [row for page in results for row in page if start <= row[0] <= end]
+        if not rows:
+            return np.zeros((0, len(COLUMNS)))
+        data = np.array(rows, dtype=float)
+        _, unique = np.unique(data[:, 0], return_index=True)
+        return data[unique]
+
+    def sync(self, symbol, productType, granularity, start, end):
+        """
+        保证缓存覆盖 [start, end]：只下载缺失的尾部（追加写）和头部（需要时重写）
+        :return: load() 的结果
+        """
+        cache = CandleCache(self.cache_root, symbol, productType, granularity)
+        ms = interval_ms(granularity)
+        # 未收盘的K线不写入缓存，否则之后的追加会漏掉它的最终值
+        end = min(end, int(time.time() * 1000) // ms * ms - ms)
+        covered = cache.time_range()
+        if covered is None:
+            cache.append(self.fetch(symbol, productType, granularity, start, end))
+            return self.load(symbol, productType, granularity, start, end)
+
+        first, last = covered
+        if end > last:
+            tail = self.fetch(symbol, productType, granularity, last + ms, end)
+            cache.append(tail)
+        if start < first:
+            head = self.fetch(symbol, productType, granularity, start, first - ms)
+            if len(head):
+                existing = cache.load()
+                merged = np.column_stack([existing[name] for name in COLUMNS]).astype(float)
+                cache.rewrite(np.vstack([head, merged]))
+        return self.load(symbol, productType, granularity, start, end)
+
+    def load(self, symbol, productType, granularity, start=None, end=None):
+        """
+        从缓存读取（零拷贝 memmap 切片）
+        :return: {列名: 数组}，可直接传给 backtest.run_backtest
+        """
+        columns = CandleCache(self.cache_root, symbol, productType, granularity).load()
+        times = columns["startTime"]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side="right"))
+        return {name: column[lo:hi] for name, column in columns.items()}
@@ -0,0 +1,171 @@
+from core.event_bus import event_bus as default_event_bus
+
+# K线周期 -> 毫秒（与 Bitget granularity 写法一致）
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1H": 60 * 60_000,
+    "2H": 2 * 60 * 60_000,
+    "4H": 4 * 60 * 60_000,
+    "6H": 6 * 60 * 60_000,
+    "12H": 12 * 60 * 60_000,
+    "1D": 24 * 60 * 60_000,
+}
+
+
+def interval_ms(interval):
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"不支持的K线周期: {interval}")
+
+
+class KlineBuilder:
+    """
+    多周期K线合成器
+    - 输入一条基础流（1m K线或逐笔成交），一次遍历同时合成 5m/15m/1H/4H 等多个周期
+    - 每跨过一个周期边界，发出 f"kline.{interval}.{symbol}" 事件，数据为 [bar]，
+      bar 格式与 WS candle 行一致：[startTime, open, high, low, close, vol1, vol2, vol3]
+    - 基础K线未收盘时的重复推送（同一 startTime）只修正，不重复累加
+    多个策略/周期因此可以共用一个 WS 订阅和一次解析
+    """
+
+    def __init__(self, symbol, intervals=("5m", "15m", "1H", "4H"), base_interval="1m", event_bus=None):
+        self.symbol = symbol
+        self.base_interval = base_interval
+        self.event_bus = event_bus or default_event_bus
+        base_ms = interval_ms(base_interval)
+        self._intervals = []
+        for interval in intervals:
+            ms = interval_ms(interval)
+            if ms % base_ms != 0:
+                raise ValueError(f"{interval} 不是基础周期 {base_interval} 的整数倍")
+            self._intervals.append((interval, ms, f"kline.{interval}.{symbol}"))
+        self._bars = {interval: None for interval, _, _ in self._intervals}  # 当前周期内已确定部分
+        self._pending = None  # 最新一根（可能未收盘的）基础K线
+        self._last_trade = None  # 已处理的最新成交时间
+
+    # -----------------------------
+    # 内部合成
+    # -----------------------------
+    def _advance(self, start_time):
+        """推进到 start_time 所在周期，返回已收盘的 (topic, interval, bar)"""
+        closed = []
+        for interval, ms, topic in self._intervals:
+            bar = self._bars[interval]
+            if bar is not None and start_time - start_time % ms != bar[0]:
+                closed.append((topic, interval, bar))
+                self._bars[interval] = None
+        return closed
+
+    def _fold(self, row):
+        """把一根已确定的基础K线并入各周期当前K线"""
+        start_time = row[0]
+        for interval, ms, _ in self._intervals:
+            bar = self._bars[interval]
+            if bar is None:
+                bar = list(row)
+                bar[0] = start_time - start_time % ms
+                self._bars[interval] = bar
+            else:
+                _merge(bar, row)
+
+    # -----------------------------
+    # 输入
+    # -----------------------------
+    def update_candle(self, row):
+        """
+        输入一根基础K线（字符串或数值）
+        :return: 本次收盘的 [(topic, interval, bar), ...]
+        """
+        row = _typed(row)
+        pending = self._pending
+        if pending is not None:
+            if row[0] < pending[0]:
+                return []
+            if row[0] == pending[0]:
+                self._pending = row
+                return []
+            self._fold(pending)
+        closed = self._advance(row[0])
+        self._pending = row
+        return closed
+
+    def update_trade(self, ts, price, size):
+        """
+        输入一笔成交
+        - 早于已处理最新成交的迟到成交（边界附近常见，成交快照也是新的在前）不推进周期：
+          所在周期仍未收盘时只并入最高/最低价和成交量（收盘价保持最新成交），已收盘的周期忽略
+        :return: 本次收盘的 [(topic, interval, bar), ...]
+        """
+        ts, price, size = int(ts), float(price), float(size)
+        quote = price * size
+        if self._last_trade is not None and ts < self._last_trade:
+            for interval, ms, _ in self._intervals:
+                bar = self._bars[interval]
+                if bar is not None and bar[0] == ts - ts % ms:
+                    if price > bar[2]:
+                        bar[2] = price
+                    if price < bar[3]:
+                        bar[3] = price
+                    bar[5] += size
+                    bar[6] += quote
+                    bar[7] += quote
+            return []
+        self._last_trade = ts
+        closed = self._advance(ts)
+        self._fold([ts, price, price, price, price, size, quote, quote])
+        return closed
+
+    def current(self, interval):
+        """某周期当前（未收盘）K线的拷贝，没有数据时返回 None"""
+        bar = self._bars[interval]
+        pending = self._pending
+        if bar is None:
+            if pending is None:
+                return None
+            ms = interval_ms(interval)
+            bar = list(pending)
+            bar[0] = pending[0] - pending[0] % ms
+            return bar
+        bar = list(bar)
+        if pending is not None:
+            _merge(bar, pending)
+        return bar
+
+    # -----------------------------
+    # 事件总线回调
+    # -----------------------------
+    async def on_candle_update(self, candles):
+        """订阅基础周期 candle 推送，收盘时发出各周期事件"""
+        for row in candles:
+            for topic, _, bar in self.update_candle(row):
+                await self.event_bus.emit(topic, [bar])
+
+    async def on_trade_update(self, trades):
+        """订阅 trade 频道推送（dict: ts/price/size）"""
+        for trade in trades:
+            for topic, _, bar in self.update_trade(trade["ts"], trade["price"], trade["size"]):
+                await self.event_bus.emit(topic, [bar])
+
+
+def _typed(row):
+    # WS 入口已解码为数值时直接拷贝
+    if type(row[0]) is int:
+        return list(row)
+    return [int(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]),
+            float(row[5]), float(row[6]), float(row[7]) if len(row) > 7 else float(row[6])]
+
+
+def _merge(bar, row):
+    if row[2] > bar[2]:
+        bar[2] = row[2]
+    if row[3] < bar[3]:
+        bar[3] = row[3]
+    bar[4] = row[4]
+    bar[5] += row[5]
+    bar[6] += row[6]
+    bar[7] += row[7]
@@ -0,0 +1,299 @@
+import itertools
+import queue
+import threading
+import time
+import uuid
+from core.event_bus import event_bus as default_event_bus
+from core.latency import latency
+from log.logger import get_logger, journal
+
+logger = get_logger("order")
+
+# 可以安全重试的返回码：限频
+RETRY_CODES = {"429"}
+
+# 平仓时“没有可平仓位”：重试时出现说明上一次平仓其实已经成功
+NO_POSITION_CODES = {"22002"}
+
+# 订单终态
+FILLED_STATES = {"filled"}
+CLOSED_STATES = {"filled", "canceled", "cancelled"}
+
+
+class OrderIntent:
+    """
+    下单意图：由策略提交，OrderManager 执行
+    - kind="open"：开仓，side 为 buy/sell；数量在执行时按可用余额计算
+    - kind="close"：一键平仓，hold_side 为 long/short
+    - client_oid 在提交时生成，重试始终使用同一个，交易所按它去重
+    """
+
+    __slots__ = ("kind", "symbol", "productType", "marginCoin", "side", "tradeSide", "hold_side",
+                 "fraction", "leverage", "min_available", "client_oid", "status", "attempts",
+                 "price", "size", "notional", "order_id", "response", "reason", "tag", "created_at",
+                 "tick_ns", "submit_ns")
+
+    def __init__(self, kind, symbol, productType, marginCoin, side=None, tradeSide=None, hold_side=None,
+                 fraction=0.25, leverage=20, min_available=10, tag=None):
+        self.kind = kind
+        self.symbol = symbol
+        self.productType = productType
+        self.marginCoin = marginCoin
+        self.side = side
+        self.tradeSide = tradeSide
+        self.hold_side = hold_side
+        self.fraction = fraction
+        self.leverage = leverage
+        self.min_available = min_available
+        self.tag = tag                  # 调用方自定义数据（如确认后要切换到的状态）
+        self.client_oid = None
+        self.status = "new"             # new / pending / acked / filled / rejected
+        self.attempts = 0
+        self.price = None
+        self.size = None
+        self.notional = 0.0             # 风控占用的名义价值
+        self.order_id = None
+        self.response = None
+        self.reason = None
+        self.created_at = time.monotonic()
+        self.tick_ns = 0                # 触发本次下单的行情帧 publish 时间（延迟统计用）
+        self.submit_ns = 0
+
+    def __repr__(self):
+        return (f"OrderIntent({self.kind} {self.symbol} {self.side or self.hold_side} "
+                f"oid={self.client_oid} status={self.status})")
+
+
+class OrderManager:
+    """
+    异步下单管道
+    - submit() 只把意图放进队列并立即返回，行情线程不会阻塞在下单 I/O 上
+    - 工作线程执行下单：网络错误/限频按退避重试，重试前先按 clientOid 查单，已受理则直接视为成功
+    - 结果通过事件总线回报：order.ack.<symbol>、order.filled.<symbol>、order.rejected.<symbol>，参数为 OrderIntent
+    - workers=0 时在 submit() 中同步执行并同步分发回报（回放/测试用，结果确定）
+    - 传入 risk（execution.risk_control.RiskEngine）时，每笔开仓在算出价格和数量后、发送前过一遍风控
+    """
+
+    def __init__(self, adapter_api, event_bus=None, workers=1, max_retries=3, retry_delay=0.5,
+                 fill_checks=3, fill_check_delay=0.2, oid_prefix="mq", risk=None):
+        self.adapter_api = adapter_api
+        self.risk = risk
+        self.event_bus = event_bus or default_event_bus
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.fill_checks = fill_checks          # 受理后查询成交的次数，0 表示不查询
+        self.fill_check_delay = fill_check_delay
+        self.oid_prefix = oid_prefix
+        self._seq = itertools.count(1)
+        self._queue = queue.Queue()
+        self._threads = []
+        self._running = False
+        self._lock = threading.Lock()
+        self.inflight = {}                      # client_oid -> OrderIntent
+
+    # -----------------------------
+    # 生命周期
+    # -----------------------------
+    def start(self):
+        """启动工作线程（submit 时也会自动启动）"""
+        with self._lock:
+            if self._running or self.workers <= 0:
+                return
+            self._running = True
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"order-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        """处理完队列中已提交的意图后停止"""
+        if not self._running:
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._running = False
+
+    def new_client_oid(self):
+        # 前缀 + 进程内序号 + 随机串，重启后也不会与旧订单冲突（Bitget 限 50 字符）
+        return f"{self.oid_prefix}{next(self._seq)}{uuid.uuid4().hex[:16]}"
+
+    # -----------------------------
+    # 提交
+    # -----------------------------
+    def submit(self, intent):
+        """
+        提交下单意图，立即返回（workers=0 时同步执行完才返回）
+        :return: intent（已分配 client_oid）
+        """
+        intent.client_oid = intent.client_oid or self.new_client_oid()
+        intent.status = "pending"
+        self.inflight[intent.client_oid] = intent
+        journal.record("order", oid=intent.client_oid, kind=intent.kind, symbol=intent.symbol,
+                       side=intent.side or intent.hold_side)
+        if latency.enabled:
+            intent.submit_ns = time.perf_counter_ns()
+        if self.workers <= 0:
+            self._execute(intent)
+        else:
+            if not self._running:
+                self.start()
+            self._queue.put(intent)
+        return intent
+
+    def open(self, symbol, productType, marginCoin, side, fraction=0.25, leverage=20, min_available=10, tag=None):
+        """开仓，side=buy开多, side=sell开空"""
+        return self.submit(OrderIntent("open", symbol, productType, marginCoin, side=side, tradeSide="open",
+                                       fraction=fraction, leverage=leverage, min_available=min_available, tag=tag))
+
+    def close(self, symbol, productType, marginCoin, hold_side, tag=None):
+        """一键平仓，hold_side=long平多, hold_side=short平空"""
+        return self.submit(OrderIntent("close", symbol, productType, marginCoin, hold_side=hold_side, tag=tag))
+
+    # -----------------------------
+    # 执行
+    # -----------------------------
+    def _worker(self):
+        while True:
+            intent = self._queue.get()
+            if intent is None:
+                return
+            if intent.submit_ns:
+                latency.record("order.queue", time.perf_counter_ns() - intent.submit_ns)
+            try:
+                self._execute(intent)
+            except Exception as e:
+                self._reject(intent, f"执行异常: {e}")
+
+    def _execute(self, intent):
+        if intent.kind == "open":
+            # 数量只在第一次计算，重试时保持不变
+            prepared = self.adapter_api.prepare_order(intent.symbol, intent.productType, intent.marginCoin,
+                                                      intent.fraction, intent.leverage, intent.min_available)
+            if prepared["size"] is None:
+                if prepared["available"] < intent.min_available:
+                    self._reject(intent, "余额不足")
+                else:
+                    self._reject(intent, "可开数量低于最小下单量")
+                return
+            intent.price, intent.size = prepared["price"], prepared["size"]
+            if self.risk is not None:
+                reason = self.risk.check(intent)
+                if reason is not None:
+                    self._reject(intent, f"风控拒绝: {reason}")
+                    return
+
+        delay = self.retry_delay
+        while True:
+            intent.attempts += 1
+            try:
+                if intent.attempts > 1 and intent.kind == "open" and self._already_placed(intent):
+                    break
+                resp = self._send(intent)
+            except Exception as e:
+                # 网络错误：请求可能已到达交易所，下一轮先查单再决定是否重发
+                resp = None
+                error = f"网络错误: {e}"
+            else:
+                code = resp.get("code")
+                if code == "00000":
+                    if self._accepted(intent, resp):
+                        break
+                    return
+                if intent.kind == "close" and intent.attempts > 1 and code in NO_POSITION_CODES:
+                    break
+                if code not in RETRY_CODES:
+                    self._reject(intent, f"{code}: {resp.get('msg')}", resp)
+                    return
+                error = f"{code}: {resp.get('msg')}"
+            if intent.attempts > self.max_retries:
+                self._reject(intent, f"重试 {self.max_retries} 次后失败，{error}", resp)
+                return
+            time.sleep(delay)
+            delay *= 2
+
+        if intent.tick_ns:
+            latency.record("order.tick_to_ack", time.perf_counter_ns() - intent.tick_ns)
+        self._report("ack", intent)
+        if intent.kind == "open" and self.fill_checks > 0:
+            self._check_fill(intent)
+
+    def _send(self, intent):
+        if intent.kind == "open":
+            return self.adapter_api.place_order(intent.symbol, intent.productType, "crossed", intent.marginCoin,
+                                                intent.price, intent.size, intent.side, "market", "GTC",
+                                                None, intent.client_oid, intent.tradeSide)
+        return self.adapter_api.close_position(intent.symbol, intent.productType, intent.hold_side)
+
+    def _accepted(self, intent, resp):
+        """解析受理结果；一键平仓全部失败时回报拒绝并返回 False"""
+        intent.response = resp
+        data = resp.get("data") or {}
+        if intent.kind == "open":
+            intent.order_id = data.get("orderId")
+            return True
+        if data.get("failureList") and not data.get("successList"):
+            failure = data["failureList"][0]
+            self._reject(intent, f"{failure.get('errorCode')}: {failure.get('errorMsg')}", resp)
+            return False
+        success = data.get("successList") or []
+        if success:
+            intent.order_id = success[0].get("orderId")
+        return True
+
+    def _already_placed(self, intent):
+        """按 clientOid 查单：上一次请求超时但实际已受理时返回 True"""
+        resp = self.adapter_api.get_order_detail(intent.symbol, intent.productType, clientOid=intent.client_oid)
+        data = resp.get("data") if resp.get("code") == "00000" else None
+        if not data or not data.get("orderId"):
+            return False
+        intent.order_id = data["orderId"]
+        intent.response = resp
+        return True
+
+    def _check_fill(self, intent):
+        """市价单受理后查询成交，成交后回报 order.filled"""
+        for _ in range(self.fill_checks):
+            time.sleep(self.fill_check_delay)
+            try:
+                resp = self.adapter_api.get_order_detail(intent.symbol, intent.productType,
+                                                         orderId=intent.order_id, clientOid=intent.client_oid)
+            except Exception as e:
+                logger.warning("查询订单失败", client_oid=intent.client_oid, error=e)
+                continue
+            data = resp.get("data") or {}
+            state = data.get("state")
+            if state in FILLED_STATES:
+                intent.response = resp
+                self._report("filled", intent)
+                return
+            if state in CLOSED_STATES:
+                self._reject(intent, f"订单已{state}", resp)
+                return
+
+    # -----------------------------
+    # 回报
+    # -----------------------------
+    def _reject(self, intent, reason, resp=None):
+        intent.reason = reason
+        if resp is not None:
+            intent.response = resp
+        self._report("rejected", intent)
+
+    def _report(self, status, intent):
+        if self.risk is not None:
+            self.risk.on_report(status, intent)
+        intent.status = "acked" if status == "ack" else status
+        # 开仓受理后还要查成交，留在 inflight 中
+        if status != "ack" or intent.kind != "open" or self.fill_checks <= 0:
+            self.inflight.pop(intent.client_oid, None)
+        journal.record(status, oid=intent.client_oid, order_id=intent.order_id, price=intent.price,
+                       size=intent.size, attempts=intent.attempts, reason=intent.reason)
+        topic = f"order.{status}.{intent.symbol}"
+        if self.workers <= 0:
+            self.event_bus.dispatch(topic, intent)
+        else:
+            self.event_bus.publish(topic, intent)
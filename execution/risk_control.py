@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import deque
+from config import risk_config
+from core.event_bus import event_bus as default_event_bus
+from log.logger import get_logger
+
+logger = get_logger("risk")
+
+
+class RiskEngine:
+    """
+    下单前风控，所有检查只读写内存计数，不发 REST 请求
+    - 开仓检查：总开关、单日亏损、下单频率、WS 最新价偏离与过期、单合约/全账户持仓名义价值
+    - 平仓单是降低风险的操作，总是放行
+    - 通过检查的开仓先占用名义价值额度，被拒绝时释放，平仓受理后清零该合约
+    """
+
+    def __init__(self, account_context=None, event_bus=None,
+                 max_symbol_notional=risk_config.MAX_SYMBOL_NOTIONAL,
+                 max_account_notional=risk_config.MAX_ACCOUNT_NOTIONAL,
+                 max_order_rate=risk_config.MAX_ORDER_RATE,
+                 max_daily_loss=risk_config.MAX_DAILY_LOSS,
+                 price_band=risk_config.PRICE_BAND,
+                 price_max_age=risk_config.PRICE_MAX_AGE):
+        self.account_context = account_context
+        self.event_bus = event_bus or default_event_bus
+        self.max_symbol_notional = max_symbol_notional
+        self.max_account_notional = max_account_notional
+        self.max_order_rate = max_order_rate
+        self.max_daily_loss = max_daily_loss
+        self.price_band = price_band
+        self.price_max_age = price_max_age
+        self._lock = threading.Lock()
+        self.prices = {}            # symbol -> (WS 最新价, monotonic 时间)
+        self.notional = {}          # symbol -> 持仓名义价值（含已占用未确认的）
+        self.total_notional = 0.0
+        self._order_times = deque() # 最近 1 秒内通过检查的下单时间
+        self.killed = None          # 总开关触发原因，None 表示正常
+        self.realized_pnl = 0.0     # 当日已实现盈亏（无账户权益时使用）
+        self._day = None
+        self._day_start_equity = None
+        self._last_equity = None    # 最近一次账户推送/对账后的权益
+        self.checked = 0
+        self.rejected = 0
+        if account_context is not None:
+            # 私有 WS 重连对账后重建持仓额度
+            self.event_bus.on("account.synced", lambda context: self.sync_positions())
+            # 每次账户推送/对账都判断是否跨日，日初权益不依赖当天第一笔下单的时间
+            self.event_bus.on("private.account", self.on_account)
+            self.event_bus.on("account.synced", lambda context: self.on_account())
+            self.on_account()
+
+    # -----------------------------
+    # 输入：行情、持仓、盈亏
+    # -----------------------------
+    def watch(self, symbol, channel):
+        """用 WS 推送 market.<channel>.<symbol> 更新最新价（K线取收盘价，ticker 取 lastPr）"""
+        if channel.startswith("candle"):
+            handler = lambda candles: self.update_price(symbol, candles[-1][4])
+        else:
+            handler = lambda data: self.update_price(symbol, float(data[-1]["lastPr"]))
+        self.event_bus.on(f"market.{channel}.{symbol}", handler)
+        return handler
+
+    def update_price(self, symbol, price):
+        self.prices[symbol] = (price, time.monotonic())
+
+    def set_position(self, symbol, notional):
+        """设置某合约当前持仓名义价值（启动/对账后调用）"""
+        with self._lock:
+            self.total_notional += notional - self.notional.get(symbol, 0.0)
+            self.notional[symbol] = notional
+
+    def sync_positions(self):
+        """从 AccountContext 的持仓重建名义价值"""
+        notional = {}
+        for p in self.account_context.all_positions():
+            symbol = p.get("instId") or p.get("symbol")
+            price = float(p.get("markPrice") or p.get("openPriceAvg") or 0)
+            notional[symbol] = notional.get(symbol, 0.0) + float(p["total"]) * price
+        with self._lock:
+            self.notional = notional
+            self.total_notional = sum(notional.values())
+
+    def on_account(self, data=None, action=None):
+        """
+        账户推送/对账后调用（AccountContext 先于本 handler 更新余额）
+        先用上一次看到的权益完成跨日，再记录本次权益
+        """
+        with self._lock:
+            self._roll_day()
+            self._last_equity = self._equity()
+            if self._day_start_equity is None:
+                # 当天第一次拿到权益
+                self._day_start_equity = self._last_equity
+
+    def record_pnl(self, pnl):
+        """记录一笔已实现盈亏（没有 AccountContext 时用于统计单日亏损）"""
+        with self._lock:
+            self._roll_day()
+            self.realized_pnl += pnl
+
+    # -----------------------------
+    # 总开关
+    # -----------------------------
+    def kill(self, reason="手动"):
+        """触发总开关：之后的开仓全部拒绝，平仓不受影响"""
+        self.killed = reason
+        logger.error("🛑 风控总开关已触发", reason=reason)
+
+    def resume(self):
+        self.killed = None
+
+    # -----------------------------
+    # 检查
+    # -----------------------------
+    def check(self, intent):
+        """
+        :return: None 表示通过（并占用额度），否则为拒绝原因
+        """
+        if intent.kind != "open":
+            return None
+        now = time.monotonic()
+        reason = self._check_open(intent, now)
+        self.checked += 1
+        if reason is not None:
+            self.rejected += 1
+        return reason
+
+    def _check_open(self, intent, now):
+        if self.killed is not None:
+            return f"总开关已触发: {self.killed}"
+
+        symbol = intent.symbol
+        quote = self.prices.get(symbol)
+        if quote is None:
+            return "没有 WS 最新价"
+        last, updated = quote
+        if now - updated > self.price_max_age:
+            return f"WS 最新价已 {now - updated:.0f}s 未更新"
+        price = float(intent.price)
+        if abs(price - last) > last * self.price_band:
+            return f"价格 {price} 偏离 WS 最新价 {last} 超过 {self.price_band:.2%}"
+        notional = float(intent.size) * price
+
+        with self._lock:
+            loss = self._daily_loss()
+            if loss >= self.max_daily_loss:
+                return f"当日亏损 {loss:.2f} 已达上限 {self.max_daily_loss}"
+
+            times = self._order_times
+            while times and now - times[0] >= 1.0:
+                times.popleft()
+            if len(times) >= self.max_order_rate:
+                return f"下单频率超过 {self.max_order_rate} 次/秒"
+
+            symbol_notional = self.notional.get(symbol, 0.0) + notional
+            if symbol_notional > self.max_symbol_notional:
+                return f"{symbol} 持仓名义价值 {symbol_notional:.2f} 超过上限 {self.max_symbol_notional}"
+            total = self.total_notional + notional
+            if total > self.max_account_notional:
+                return f"账户持仓名义价值 {total:.2f} 超过上限 {self.max_account_notional}"
+
+            # 通过：记录下单时间并占用额度
+            times.append(now)
+            self.notional[symbol] = symbol_notional
+            self.total_notional = total
+        intent.notional = notional
+        return None
+
+    def _daily_loss(self):
+        """当日亏损（正数为亏）：有账户权益时按日初权益计算，否则按已实现盈亏（需持有锁）"""
+        self._roll_day()
+        equity = self._equity()
+        if equity is None or self._day_start_equity is None:
+            return -self.realized_pnl
+        return self._day_start_equity - equity
+
+    def _roll_day(self):
+        day = time.gmtime().tm_yday
+        if day != self._day:
+            self._day = day
+            self.realized_pnl = 0.0
+            # 日初权益取跨日前最后一次看到的权益：跨日后先出现回撤、之后才下单或推送时，回撤也计入当日亏损
+            self._day_start_equity = self._last_equity if self._last_equity is not None else self._equity()
+
+    def _equity(self):
+        context = self.account_context
+        if context is None:
+            return None
+        # 单次 dict 读取，不需要拿 AccountContext 的锁
+        account = context.balances.get(context.marginCoin)
+        if not account:
+            return None
+        # REST 返回 accountEquity，WS 推送为 equity
+        equity = account.get("accountEquity") or account.get("equity")
+        return float(equity) if equity is not None else None
+
+    # -----------------------------
+    # 下单回报
+    # -----------------------------
+    def on_report(self, status, intent):
+        """OrderManager 回报时调用：开仓被拒绝释放额度，平仓受理后清零该合约"""
+        if status == "rejected" and intent.notional:
+            with self._lock:
+                self.notional[intent.symbol] = max(0.0, self.notional.get(intent.symbol, 0.0) - intent.notional)
+                self.total_notional = max(0.0, self.total_notional - intent.notional)
+            intent.notional = 0.0
+        elif status == "ack" and intent.kind == "close":
+            self.set_position(intent.symbol, 0.0)
@@ -44,11 +44,22 @@ class Indicators:
         return df["close"].rolling(window=period).mean()
 
     @staticmethod
-    def rsi(df: pd.DataFrame, period=14):
-        """计算 RSI 指标"""
+    def rsi(df: pd.DataFrame, period=14, method="sma"):
+        """
+        计算 RSI 指标
+        method: "sma" 为 rolling 均值；"wilder" 为 Wilder 平滑（alpha=1/period），可增量更新
+        """
         delta = df["close"].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        gain = delta.where(delta > 0, 0)
+        loss = -delta.where(delta < 0, 0)
+        if method == "sma":
+            gain = gain.rolling(window=period).mean()
+            loss = loss.rolling(window=period).mean()
+        elif method == "wilder":
+            gain = gain.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+            loss = loss.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+        else:
+            raise ValueError(f"未知的 RSI 平滑方式: {method}")
         rs = gain / loss
         rsi = 100 - (100 / (1 + rs))
         return rsi
\ No newline at end of file
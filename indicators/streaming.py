@@ -0,0 +1,103 @@
+class StreamingEMA:
+    """
+    增量 EMA（与 pandas ewm(span=span, adjust=False) 逐点一致）
+    - 每根K线 O(1) 更新
+    - 同一根未收盘K线的多次推送通过 revise=True 修正最后一个值，而不是追加
+    """
+
+    __slots__ = ("span", "alpha", "_old_wt", "value", "_base")
+
+    def __init__(self, span):
+        self.span = span
+        # 与 pandas 内部一致：com = (span - 1) / 2, alpha = 1 / (1 + com)
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        self._old_wt = 1.0 - self.alpha
+        self.value = None   # 当前值（包含最新一根K线）
+        self._base = None   # 最新一根K线之前的值，用于修正
+
+    def update(self, x, revise=False):
+        """
+        :param x: 新的输入值
+        :param revise: True 表示修正最后一个点（同一根K线再次推送）
+        :return: 更新后的 EMA
+        """
+        if not revise:
+            self._base = self.value
+        base = self._base
+        if base is None or base == x:
+            self.value = x
+        else:
+            self.value = (self._old_wt * base + self.alpha * x) / (self._old_wt + self.alpha)
+        return self.value
+
+    def state(self):
+        return [self.value, self._base]
+
+    def load_state(self, state):
+        self.value, self._base = state
+
+
+class StreamingMACD:
+    """
+    增量 MACD，保存 EMA/DIF/DEA 状态
+    - update(startTime, close)：新 startTime 追加一根，相同 startTime 修正最后一根
+    - 结果与 Indicators.macd 在同一组收盘价上逐点一致
+    """
+
+    def __init__(self, short=12, long=26, signal=9):
+        self.short = short
+        self.long = long
+        self.signal = signal
+        self.reset()
+
+    def reset(self):
+        self.ema_short = StreamingEMA(self.short)
+        self.ema_long = StreamingEMA(self.long)
+        self.ema_dea = StreamingEMA(self.signal)
+        self.last_time = None
+        self.count = 0      # 已处理的K线根数（修正不计数）
+        self.last = None    # 最新一根 (DIF, DEA, MACD)
+        self.prev = None    # 上一根 (DIF, DEA, MACD)
+
+    def update(self, start_time, close):
+        """
+        推送一根K线的收盘价
+        :return: 是否被采用（早于最后一根的旧K线会被忽略）
+        """
+        if self.last_time is not None and start_time < self.last_time:
+            return False
+        revise = start_time == self.last_time
+        if not revise:
+            self.prev = self.last
+            self.last_time = start_time
+            self.count += 1
+
+        dif = self.ema_short.update(close, revise) - self.ema_long.update(close, revise)
+        dea = self.ema_dea.update(dif, revise)
+        self.last = (dif, dea, (dif - dea) * 2)
+        return True
+
+    def state(self):
+        """可 JSON 序列化的完整状态，用于快照"""
+        return {
+            "params": [self.short, self.long, self.signal],
+            "ema_short": self.ema_short.state(),
+            "ema_long": self.ema_long.state(),
+            "ema_dea": self.ema_dea.state(),
+            "last_time": self.last_time,
+            "count": self.count,
+            "last": self.last,
+            "prev": self.prev,
+        }
+
+    def load_state(self, state):
+        """从 state() 的结果恢复；参数不一致时抛出 ValueError"""
+        if list(state["params"]) != [self.short, self.long, self.signal]:
+            raise ValueError(f"MACD 参数不一致: {state['params']}")
+        self.ema_short.load_state(state["ema_short"])
+        self.ema_long.load_state(state["ema_long"])
+        self.ema_dea.load_state(state["ema_dea"])
+        self.last_time = state["last_time"]
+        self.count = state["count"]
+        self.last = tuple(state["last"]) if state["last"] is not None else None
+        self.prev = tuple(state["prev"]) if state["prev"] is not None else None
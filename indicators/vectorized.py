@@ -0,0 +1,183 @@
+import numpy as np
+
+# 批量计算约定：输入为 (交易对数, 时间) 的对齐矩阵，所有函数沿最后一维（时间）计算，
+# 一维数组视为单个交易对
+
+
+def ema(x, span):
+    """
+    NumPy 版 EMA（等价于 pandas ewm(span=span, adjust=False)），沿最后一维计算
+    递推式按块展开成 cumsum，块长保证 (1-alpha)^-block 不溢出，
+    长序列只需 n/block 次向量运算，不需要逐点的 Python 循环
+    """
+    x = np.asarray(x, dtype=float)
+    n = x.shape[-1]
+    out = np.empty_like(x)
+    if n == 0:
+        return out
+    alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+    w = 1.0 - alpha
+    out[..., 0] = x[..., 0]
+    if w == 0.0:
+        out[...] = x
+        return out
+    block = int(max(1, min(n, 300.0 / -np.log(w))))
+    powers = w ** np.arange(1, block + 1)
+    inv_powers = 1.0 / powers
+    prev = x[..., 0]
+    for start in range(1, n, block):
+        seg = x[..., start:start + block]
+        m = seg.shape[-1]
+        # y[start+k] = w^(k+1) * (prev + alpha * sum_{j<=k} seg[j] * w^-(j+1))
+        acc = np.cumsum(seg * inv_powers[:m], axis=-1)
+        y = powers[:m] * (prev[..., None] + alpha * acc)
+        out[..., start:start + m] = y
+        prev = y[..., -1]
+    return out
+
+
+def macd(close, short=12, long=26, signal=9):
+    """
+    NumPy 版 MACD，与 Indicators.macd 一致
+    :return: (DIF, DEA, MACD) 三个数组
+    """
+    dif = ema(close, short) - ema(close, long)
+    dea = ema(dif, signal)
+    return dif, dea, (dif - dea) * 2
+
+
+def cross_signals(dif, dea):
+    """
+    MACD 交叉信号（与 Strategy.macd_signal 判定一致）
+    :return: int8 数组，1=金叉(long)，-1=死叉(short)，0=hold；第 0 个点恒为 0
+    """
+    out = np.zeros(dif.shape, dtype=np.int8)
+    prev_dif, prev_dea = dif[..., :-1], dea[..., :-1]
+    last_dif, last_dea = dif[..., 1:], dea[..., 1:]
+    out[..., 1:][(prev_dif < prev_dea) & (last_dif > last_dea)] = 1
+    out[..., 1:][(prev_dif > prev_dea) & (last_dif < last_dea)] = -1
+    return out
+
+
+def ma(x, period=20):
+    """简单移动平均（等价于 rolling(period).mean()），前 period-1 个点为 NaN"""
+    x = np.asarray(x, dtype=float)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < period:
+        return out
+    csum = np.cumsum(x, axis=-1)
+    out[..., period - 1] = csum[..., period - 1]
+    out[..., period:] = csum[..., period:] - csum[..., :-period]
+    out[..., period - 1:] /= period
+    return out
+
+
+def rsi(x, period=14, method="sma"):
+    """
+    RSI，与 Indicators.rsi 一致
+    :param method: "sma" 为 rolling 均值；"wilder" 为 Wilder 平滑（alpha=1/period），可增量更新
+    """
+    x = np.asarray(x, dtype=float)
+    delta = np.zeros(x.shape)
+    delta[..., 1:] = np.diff(x, axis=-1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    if method == "sma":
+        avg_gain, avg_loss = ma(gain, period), ma(loss, period)
+    elif method == "wilder":
+        # alpha = 1/period 等价于 span = 2*period-1
+        avg_gain, avg_loss = ema(gain, 2 * period - 1), ema(loss, 2 * period - 1)
+        avg_gain[..., :period - 1] = np.nan
+        avg_loss[..., :period - 1] = np.nan
+    else:
+        raise ValueError(f"未知的 RSI 平滑方式: {method}")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+# -----------------------------
+# 批量增量计算：每根K线一次向量运算更新所有交易对
+# -----------------------------
+class BatchEMA:
+    """多交易对增量 EMA，语义同 StreamingEMA（revise=True 修正最后一个点）"""
+
+    def __init__(self, n, span):
+        self.alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+        self._old_wt = 1.0 - self.alpha
+        self.value = np.full(n, np.nan)
+        self._base = np.full(n, np.nan)
+        self._started = False
+        self._has_base = False
+
+    def update(self, x, revise=False):
+        if not revise:
+            self._base[:] = self.value
+            self._has_base = self._started
+        self._started = True
+        if not self._has_base:
+            self.value[:] = x
+        else:
+            np.multiply(self._base, self._old_wt, out=self.value)
+            self.value += self.alpha * x
+            self.value /= self._old_wt + self.alpha
+        return self.value
+
+
+class BatchMACD:
+    """多交易对增量 MACD，输入每根K线的收盘价向量"""
+
+    def __init__(self, n, short=12, long=26, signal=9):
+        self.ema_short = BatchEMA(n, short)
+        self.ema_long = BatchEMA(n, long)
+        self.ema_dea = BatchEMA(n, signal)
+        self.dif = np.full(n, np.nan)
+
+    def update(self, close, revise=False):
+        """:return: (DIF, DEA, MACD) 向量"""
+        np.subtract(self.ema_short.update(close, revise), self.ema_long.update(close, revise), out=self.dif)
+        dea = self.ema_dea.update(self.dif, revise)
+        return self.dif, dea, (self.dif - dea) * 2
+
+
+class BatchMA:
+    """多交易对增量简单移动平均（环形缓冲 + 滚动和）"""
+
+    def __init__(self, n, period=20):
+        self.period = period
+        self._buf = np.zeros((period, n))
+        self._sum = np.zeros(n)
+        self._count = 0
+
+    def update(self, x):
+        slot = self._count % self.period
+        self._sum -= self._buf[slot]
+        self._buf[slot] = x
+        self._sum += x
+        self._count += 1
+        if self._count < self.period:
+            return np.full(len(self._sum), np.nan)
+        return self._sum / self.period
+
+
+class BatchRSI:
+    """多交易对增量 RSI（Wilder 平滑），结果与 rsi(method="wilder") 一致"""
+
+    def __init__(self, n, period=14):
+        self.period = period
+        self.avg_gain = BatchEMA(n, 2 * period - 1)
+        self.avg_loss = BatchEMA(n, 2 * period - 1)
+        self._prev = None
+        self._count = 0
+
+    def update(self, close):
+        close = np.asarray(close, dtype=float)
+        delta = np.zeros(len(close)) if self._prev is None else close - self._prev
+        self._prev = close.copy()
+        gain = self.avg_gain.update(np.maximum(delta, 0.0))
+        loss = self.avg_loss.update(np.maximum(-delta, 0.0))
+        self._count += 1
+        if self._count < self.period:
+            return np.full(len(close), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return 100 - 100 / (1 + gain / loss)
+
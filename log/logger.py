@@ -0,0 +1,212 @@
+"""
+异步结构化日志
+- 调用方只做一次 deque.append（GIL 下原子操作，不加锁），格式化和写盘/写终端都在后台线程
+- 队列满时丢弃并计数，磁盘或终端再慢也不会阻塞行情线程
+- 每条记录带 monotonic 时间（排序/算间隔）和墙钟时间（对照交易所时间）
+- 日志：JSON lines（文件）/ 可读文本（终端）；交易日志 journal：信号、下单、回报的紧凑 JSON lines
+
+用法：
+    from log.logger import get_logger, journal
+    logger = get_logger("ws")
+    logger.info("WebSocket 已连接", subscriptions=3)
+    journal.record("signal", symbol="BTCUSDT", signal="long")
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+def format_json(record):
+    mono, wall, level, name, msg, fields = record
+    entry = {"mono": round(mono, 6), "ts": int(wall * 1000), "level": level, "logger": name, "msg": msg}
+    if fields:
+        entry.update(fields)
+    return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def format_text(record):
+    mono, wall, level, name, msg, fields = record
+    line = f"{time.strftime('%H:%M:%S', time.localtime(wall))} {level[0]} [{name}] {msg}"
+    if fields:
+        line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+    return line
+
+
+def format_journal(record):
+    # journal 只保留时间、类型和字段，键名尽量短
+    mono, wall, _, kind, _, fields = record
+    entry = {"t": round(mono, 6), "ts": int(wall * 1000), "k": kind}
+    entry.update(fields)
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class LogWriter:
+    """
+    后台写线程：批量取出队列中的记录，按每个输出的格式写入
+    :param maxsize: 队列上限，超过后新记录被丢弃（dropped 计数）
+    :param flush_interval: 队列为空时的轮询间隔（秒）
+    """
+
+    def __init__(self, maxsize=100000, flush_interval=0.1):
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+        self.outputs = []           # [(可写对象, 格式化函数, 是否由本类打开)]
+        self._queue = deque()
+        self._thread = None
+        self._running = False
+        self._stopped = False       # stop() 之后不再接收记录（文件已关闭）
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def add_stream(self, stream, formatter=format_text):
+        self.outputs.append((stream, formatter, False))
+
+    def add_file(self, path, formatter=format_json):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.outputs.append((open(path, "a", encoding="utf-8", buffering=1 << 16), formatter, True))
+
+    def put(self, record):
+        """非阻塞入队，队列满或已 stop() 时丢弃"""
+        if self._stopped or len(self._queue) >= self.maxsize:
+            self.dropped += 1
+            return False
+        self._queue.append(record)
+        if not self._running:
+            self.start()
+        return True
+
+    def start(self):
+        with self._lock:
+            if self._running or self._stopped:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        """写完队列中剩余的记录后停止，并关闭打开的文件；之后的 put() 直接丢弃"""
+        self._stopped = True
+        if self._running:
+            self._running = False
+            self._thread.join(timeout)
+        self._drain()
+        for output, _, owned in self.outputs:
+            if owned:
+                output.close()
+
+    def _run(self):
+        while self._running:
+            if not self._queue:
+                time.sleep(self.flush_interval)
+                continue
+            self._drain()
+
+    def _drain(self):
+        queue = self._queue
+        records = []
+        while queue:
+            records.append(queue.popleft())
+        if not records:
+            return
+        for output, formatter, _ in self.outputs:
+            try:
+                output.write("\n".join(formatter(r) for r in records) + "\n")
+                output.flush()
+            except Exception:
+                # 写失败（磁盘满、终端关闭等）只计数，不影响调用方
+                self.errors += 1
+        self.written += len(records)
+
+
+class Logger:
+    """按名称区分来源的日志入口，级别过滤在入队前完成"""
+
+    __slots__ = ("name", "writer", "level")
+
+    def __init__(self, name, writer, level=LEVELS["INFO"]):
+        self.name = name
+        self.writer = writer
+        self.level = level
+
+    def debug(self, msg, /, **fields):
+        if self.level <= 10 and self.writer.outputs:
+            self.writer.put((time.monotonic(), time.time(), "DEBUG", self.name, msg, fields))
+
+    def info(self, msg, /, **fields):
+        if self.level <= 20 and self.writer.outputs:
+            self.writer.put((time.monotonic(), time.time(), "INFO", self.name, msg, fields))
+
+    def warning(self, msg, /, **fields):
+        if self.level <= 30 and self.writer.outputs:
+            self.writer.put((time.monotonic(), time.time(), "WARNING", self.name, msg, fields))
+
+    def error(self, msg, /, **fields):
+        if self.writer.outputs:
+            self.writer.put((time.monotonic(), time.time(), "ERROR", self.name, msg, fields))
+
+
+class Journal:
+    """
+    交易日志：信号、下单、受理、拒绝、成交
+    - 未配置输出文件时 record() 直接返回
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def record(self, event, /, **fields):
+        if self.writer.outputs:
+            self.writer.put((time.monotonic(), time.time(), None, event, None, fields))
+
+
+# -----------------------------
+# 全局实例
+# -----------------------------
+log_writer = LogWriter()
+log_writer.add_stream(sys.stdout)   # 默认输出可读文本到终端，configure() 可改为写文件
+journal_writer = LogWriter()
+journal = Journal(journal_writer)
+_loggers = {}
+_level = LEVELS["INFO"]
+
+
+def get_logger(name):
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers[name] = Logger(name, log_writer, _level)
+    return logger
+
+
+def configure(path=None, journal_path=None, level="INFO", console=True):
+    """
+    :param path: 日志文件（JSON lines），None 表示不写文件
+    :param journal_path: 交易日志文件，None 表示不记录
+    :param console: 是否同时输出可读文本到终端
+    """
+    global _level
+    _level = LEVELS[level]
+    for logger in _loggers.values():
+        logger.level = _level
+    log_writer.outputs = []
+    if console:
+        log_writer.add_stream(sys.stdout)
+    if path:
+        log_writer.add_file(path)
+    journal_writer.outputs = []
+    if journal_path:
+        journal_writer.add_file(journal_path, format_journal)
+
+
+def shutdown():
+    """程序退出前调用，写完剩余日志"""
+    log_writer.stop()
+    journal_writer.stop()
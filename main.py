@@ -1,6 +1,21 @@
 from api.adapter_api import APIAdapter
 from ws.adapter_ws import WebSocketAdapter
+from ws.frame_journal import FrameRecorder
 from strategy.strategy import Strategy
+from core.event_bus import event_bus
+from core.context import AccountContext
+from execution.order_manager import OrderManager
+from execution.risk_control import RiskEngine
+from core.latency import latency
+from log import logger as log
+
+# 日志：终端可读文本 + JSON lines 文件；交易日志单独一份
+log.configure(path="data/log/app.jsonl", journal_path="data/log/journal.jsonl")
+
+# 链路延迟统计：每分钟写一次日志，kill -USR1 <pid> 立即输出
+latency.enable()
+latency.start_dump(60)
+latency.install_signal()
 
 # ----------------------
 # 1. 初始化 APIAdapter（完全不关心交易所内部实现）
@@ -10,20 +25,42 @@ API_SECRET = "xx"
 PASSPHRASE = "xx"
 TEST = True
 
+adapter_api = APIAdapter(
+    "bitget",
+    TEST,
+    API_KEY,
+    API_SECRET,
+    PASSPHRASE,
+    base_url="https://api.bitget.com"
+)
+# 预热连接池，第一笔下单不再承担 TCP/TLS 握手
+adapter_api.warmup()
+# 加载合约规格，张数在本地计算
+adapter_api.load_contracts("USDT-FUTURES")
+
+# 账户状态：启动时 REST 全量同步一次，之后由私有 WS 推送维护，余额/持仓直接读内存
+account_context = AccountContext(adapter_api, "USDT-FUTURES", "USDT")
+account_context.resync()
+adapter_api.account_context = account_context
+
+# 风控：每笔开仓在发送前检查，最新价来自 WS K线推送
+risk = RiskEngine(account_context)
+risk.sync_positions()
+risk.watch("BTCUSDT", "candle15m")
+
 strategy = Strategy(
-    APIAdapter(
-        "bitget",
-        TEST,
-        API_KEY,
-        API_SECRET,
-        PASSPHRASE,
-        base_url="https://api.bitget.com"
-    ),
+    adapter_api,
     symbol="BTCUSDT", 
     productType="USDT-FUTURES", 
     marginCoin="USDT", 
-    window_size=100
+    window_size=100,
+    candle_interval="15m",
+    snapshot_path="data/state/BTCUSDT_15m.json",
+    account_context=account_context,
+    order_manager=OrderManager(adapter_api, risk=risk)
 )
+# 用 REST 历史K线和本地快照预热，重启后第一根实时K线即可出信号
+strategy.warm_start()
 
 ws_client = WebSocketAdapter(
     "bitget",
@@ -33,9 +70,30 @@ ws_client = WebSocketAdapter(
     proxy_type="http", 
     inst_type="USDT-FUTURES", 
     symbol="BTCUSDT", 
-    candle_interval="15m"
+    candle_interval="15m",
+    # 录制原始帧，出问题时用 ws.frame_journal.FrameReplayer 原样回放
+    recorder=FrameRecorder("data/ws", prefix="public"),
+    # 断线重连后用 REST 补齐缺失的K线
+    rest_api=adapter_api
 )
 
+# 私有频道：委托、持仓、账户推送
+private_ws_client = WebSocketAdapter(
+    "bitget",
+    "wss://ws.bitget.com/v2/ws/private",
+    proxy_host="127.0.0.1",
+    proxy_port=10809,
+    proxy_type="http",
+    inst_type="USDT-FUTURES",
+    api_key=API_KEY,
+    api_secret=API_SECRET,
+    passphrase=PASSPHRASE
+)
+
+# 启动事件总线分发线程，WS 线程只负责投递
+event_bus.start()
+
+private_thread = private_ws_client.ws.connect()
 thread = ws_client.ws.connect()
 # 保持主线程活着
 try:
@@ -44,8 +102,13 @@ try:
 except KeyboardInterrupt:
     print("手动中断，关闭 WebSocket...")
     ws_client.close()  # 安全关闭
+    private_ws_client.close()
     thread.join()      # 等待线程结束
+    private_thread.join()
+    strategy.order_manager.stop()  # 等待已提交的下单意图处理完
+    event_bus.stop()
     print("程序已退出")
+    log.shutdown()
 
 # 总余额
 # print(adapter_api.get_account("USDT-FUTURES"))
@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+from api.adapter_api import APIAdapter
+from ws.bitget.bitget_feed import BitgetFeedManager
+from core.event_bus import event_bus
+from core.shm_ring import ShmRingWriter, ShmPublisher
+from strategy.worker import run_worker
+from log import logger as log
+
+# 多进程运行：本进程只负责行情（一组 WS 连接），解码后的K线/ticker 写入共享内存环形缓冲；
+# 每个工作进程挂载同一块共享内存，用自己的账户凭证运行若干策略
+# 工作进程用 spawn 启动：fork 会继承本进程日志/事件总线的“已启动”状态，但不继承它们的后台线程
+
+logger = log.get_logger("main")
+
+RING_NAME = f"bitget-market-{os.getpid()}"
+
+# ----------------------
+# 1. 工作进程：账户凭证 + 该账户上运行的策略
+# ----------------------
+WORKERS = {
+    "account-a": {
+        "credentials": {"api_key": "xx", "api_secret": "xx", "passphrase": "xx", "test": True,
+                        "base_url": "https://api.bitget.com"},
+        "strategies": [
+            {"symbol": "BTCUSDT", "candle_interval": "15m", "window_size": 100,
+             "snapshot_path": "data/state/account-a_BTCUSDT_15m.json"},
+        ],
+    },
+    "account-b": {
+        "credentials": {"api_key": "xx", "api_secret": "xx", "passphrase": "xx", "test": True,
+                        "base_url": "https://api.bitget.com"},
+        "strategies": [
+            {"symbol": "ETHUSDT", "candle_interval": "15m", "window_size": 100,
+             "snapshot_path": "data/state/account-b_ETHUSDT_15m.json"},
+        ],
+    },
+}
+
+if __name__ == "__main__":
+    log.configure(path="data/log/feed.jsonl")
+
+    # ----------------------
+    # 2. 行情：所有工作进程用到的交易对/周期合并订阅一次，外加 ticker
+    # ----------------------
+    rest_api = APIAdapter("bitget", True, "", "", "", base_url="https://api.bitget.com")
+    feed = BitgetFeedManager("wss://ws.bitget.com/v2/ws/public", proxy_host="127.0.0.1", proxy_port=10809,
+                             proxy_type="http", inst_type="USDT-FUTURES", rest_api=rest_api)
+    writer = ShmRingWriter(RING_NAME)
+    publisher = ShmPublisher(writer, event_bus)
+    for worker in WORKERS.values():
+        for spec in worker["strategies"]:
+            for channel in (f"candle{spec['candle_interval']}", "ticker"):
+                feed.add(spec["symbol"], channel)
+                publisher.add(spec["symbol"], channel)
+
+    # ----------------------
+    # 3. 启动工作进程（先建好共享内存再启动，工作进程一启动即可挂载）
+    # ----------------------
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    processes = []
+    for name, worker in WORKERS.items():
+        process = context.Process(target=run_worker, name=name,
+                                  args=(RING_NAME, name, worker["credentials"], worker["strategies"],
+                                        stop_event))
+        process.start()
+        processes.append(process)
+
+    event_bus.start()
+    threads = feed.connect()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        logger.info("手动中断，关闭行情与工作进程...")
+    finally:
+        feed.close()
+        stop_event.set()
+        for process in processes:
+            process.join(10)
+        publisher.close()
+        event_bus.stop()
+        writer.close()
+        rest_api.close()
+        log.shutdown()
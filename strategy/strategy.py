@@ -1,117 +1,246 @@
-import pandas as pd
-from indicators.macd import Indicators
-from api.adapter.adapter_api import APIAdapter
-from core.event_bus import event_bus
+import json
+import os
+import time
+from indicators.streaming import StreamingMACD
+from dataProcess.candle_store import CandleStore
+from api.adapter_api import APIAdapter
+from core.event_bus import event_bus as default_event_bus
+from core.latency import latency
+from execution.order_manager import OrderIntent, OrderManager
+from ws.bitget.bitget_decode import decode_candles
+from config import strategy_config
+from log.logger import get_logger, journal
+
+logger = get_logger("strategy")
 
 class Strategy:
     """策略类，支持滑动窗口和MACD信号交易"""
-    def __init__(self, adapter_api: APIAdapter, symbol, productType, marginCoin, window_size=100):
+    def __init__(self, adapter_api: APIAdapter, symbol, productType, marginCoin, window_size=strategy_config.WINDOW_SIZE,
+                 candle_interval="15m", event_bus=None, snapshot_path=None, snapshot_interval=60,
+                 macd_short=strategy_config.MACD_SHORT, macd_long=strategy_config.MACD_LONG,
+                 macd_signal=strategy_config.MACD_SIGNAL, fraction=strategy_config.POSITION_FRACTION,
+                 leverage=strategy_config.LEVERAGE, min_available=strategy_config.MIN_AVAILABLE,
+                 order_manager=None, account_context=None):
         self.adapter_api = adapter_api
         self.symbol = symbol
         self.productType = productType
         self.marginCoin = marginCoin
-        self.event_bus = event_bus
+        self.event_bus = event_bus or default_event_bus
         self.window_size = window_size
-        self.candles_df = pd.DataFrame()  # 滑动窗口K线数据
+        self.candle_interval = candle_interval
+        self.candles = CandleStore(window_size)  # 滑动窗口K线数据
+        self.macd = StreamingMACD(macd_short, macd_long, macd_signal)  # 增量MACD状态
+        self.fraction = fraction      # 开仓保证金占可用余额比例
+        self.leverage = leverage
+        self.min_available = min_available
+        # 下单在 OrderManager 的工作线程执行，状态只在收到确认后切换
+        self.order_manager = order_manager or OrderManager(adapter_api, self.event_bus)
+        self.pending = None   # 等待确认的下单意图，确认前不再发出新的指令
+        # 指标/状态机快照，重启后免去重新预热
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._last_snapshot = time.monotonic()
 
-        position = adapter_api.get_single_position(symbol, productType, marginCoin)
-        if len(position["data"]) == 0:
+        # 账户状态由私有 WS 维护（core.context.AccountContext），已同步时直接读内存
+        self.account_context = account_context
+        if account_context is not None and account_context.synced:
+            position = account_context.position(symbol)
+            positions = [position] if position else []
+        else:
+            positions = adapter_api.get_single_position(symbol, productType, marginCoin)["data"]
+        if len(positions) == 0:
             self.state = "toOrder"  # 初始等待下单状态
         else:
-            if position["data"][0]["holdSide"] == "long":
+            if positions[0]["holdSide"] == "long":
                 self.state = "ordered_long"  # 有一个多单
-            if position["data"][0]["holdSide"] == "short":
+            if positions[0]["holdSide"] == "short":
                 self.state = "ordered_short"  # 有一个空单
-        print("当前开单状态:" + self.state)
+        logger.info("当前开单状态:" + self.state, symbol=symbol)
 
-        event_bus.on("candle_update", self.on_candle_update)
+        # 与 WS 发布的主题一致：market.candle<interval>.<symbol>
+        self.event_bus.on(f"market.candle{candle_interval}.{symbol}", self.on_candle_update)
+        # 下单回报：order.ack / order.filled / order.rejected
+        self.event_bus.on(f"order.*.{symbol}", self.on_order_update)
 
     def on_candle_update(self, candles):
         """
         WebSocket回调，每次推送新的K线数据
-        candles: list[list] 格式的K线数据
+        candles: [(startTime, open, high, low, close, vol1, vol2, vol3), ...]，WS 入口已转为数值
         """
-        df_new = pd.DataFrame(candles, columns=[
-            "startTime","open","high","low","close","vol1","vol2","vol3"
-        ])
-        df_new[["open","high","low","close","vol1","vol2","vol3"]] = df_new[["open","high","low","close","vol1","vol2","vol3"]].astype(float)
-        # float_cols = ["open","high","low","close","vol1","vol2","vol3"]
-        # df_new.loc[:, float_cols] = df_new.loc[:, float_cols].astype(float)
-
-        # columns=["startTime","open","high","low","close","vol1","vol2","vol3"]
-        # df_new = pd.DataFrame(candles, columns)
-        # df_new.loc[:, columns] = df_new.loc[:, columns].astype(float)
-
-        # 初始化或累积滑动窗口
-        if self.candles_df.empty:
-            self.candles_df = df_new
-        else:
-            self.candles_df = pd.concat([self.candles_df, df_new], ignore_index=True)
-        
-        # 只保留最近 window_size 根K线
-        self.candles_df = self.candles_df.iloc[-self.window_size:]
+        started = time.perf_counter_ns() if latency.enabled else 0
+        # 以 startTime 为键原地写入滑动窗口，并增量更新MACD
+        # （同一 startTime 的推送只修正最后一根）
+        for row in candles:
+            if self.candles.upsert(row):
+                self.macd.update(row[0], row[4])
+
+        # 定期保存快照
+        if self.snapshot_path and time.monotonic() - self._last_snapshot >= self.snapshot_interval:
+            self.save_state()
 
         # 计算MACD信号
         signal = self.macd_signal()
+        if started:
+            decided = time.perf_counter_ns()
+            latency.record("strategy.indicator", decided - started)
+
+        if signal != "hold":
+            last = self.macd.last
+            journal.record("signal", symbol=self.symbol, signal=signal, bar=self.macd.last_time,
+                           close=candles[-1][4], dif=last[0], dea=last[1], state=self.state,
+                           pending=self.pending is not None)
+
+        # 执行交易逻辑（上一笔指令未确认时不动作）
+        if self.pending is not None:
+            return
+        self._decide(signal)
+        if started:
+            latency.record("strategy.decision", time.perf_counter_ns() - decided)
 
-        # 执行交易逻辑
+    def _decide(self, signal):
+        """状态机：根据信号提交开仓/平仓意图"""
         if self.state == "toOrder":
             if signal == "long":
-                print("📈 开多")
-                self.order("buy", "open")
-                self.state = "ordered_long"
+                logger.info("📈 开多", symbol=self.symbol)
+                self.order("buy", "open", "ordered_long")
             elif signal == "short":
-                print("📉 开空")
-                self.order("sell", "open")
-                self.state = "ordered_short"
+                logger.info("📉 开空", symbol=self.symbol)
+                self.order("sell", "open", "ordered_short")
         elif self.state == "ordered_long":
             if signal == "short":
-                print("平多")
+                logger.info("平多", symbol=self.symbol)
                 #一键平多
                 self.close("long")
-                #self.order("buy", "close")
-                self.state = "toOrder"
         elif self.state == "ordered_short":
             if signal == "long":
-                print("平空")
+                logger.info("平空", symbol=self.symbol)
                 #一键平空
                 self.close("short")
-                #self.order("sell", "close")
+
+    def on_order_update(self, intent):
+        """
+        OrderManager 回报（在事件分发线程执行）
+        受理后切换到 intent.tag 指定的状态；被拒绝时保持原状态，下一个信号再试
+        """
+        if intent is not self.pending:
+            # 受理后又被撤销（未成交）的开仓单：回到等待下单
+            if intent.status == "rejected" and intent.kind == "open" and self.state == intent.tag:
+                logger.warning("⚠️ 订单未成交", client_oid=intent.client_oid, reason=intent.reason)
                 self.state = "toOrder"
-                
+            return
+        if intent.status == "rejected":
+            logger.warning("⚠️ 下单失败", client_oid=intent.client_oid, reason=intent.reason)
+        else:
+            self.state = intent.tag
+            logger.info("当前开单状态:" + self.state, symbol=self.symbol, client_oid=intent.client_oid)
+        self.pending = None
 
+    # -----------------------------
+    # 预热与快照
+    # -----------------------------
+    def warm_start(self, history=None, limit=500):
+        """
+        启动时预热：用历史K线填满滑动窗口并恢复MACD，第一根实时K线即可给出有效信号
+        - history: 数值K线行列表或 {列名: 数组}（如 CandleDownloader.load 的结果）；
+                   不传时通过 REST get_kline 拉取最近 limit 根
+        - 有快照时先恢复快照，只回放快照之后的K线；快照与历史接不上时从头回放
+        :return: 预热耗时（秒）
+        """
+        start = time.monotonic()
+        if history is None:
+            resp = self.adapter_api.get_kline(self.symbol, self.productType, self.candle_interval, limit=limit)
+            rows = sorted(decode_candles(resp.get("data") or []))
+        elif isinstance(history, dict):
+            rows = list(zip(*(history[name].tolist() for name in
+                              ("startTime", "open", "high", "low", "close", "vol1", "vol2", "vol3"))))
+        else:
+            rows = list(history)
+
+        restored = self.load_state() if self.snapshot_path else False
+        if restored and (not rows or rows[0][0] > self.macd.last_time):
+            logger.warning("⚠️ 快照与历史K线接不上，重新计算MACD")
+            restored = False
+        if not restored:
+            self.macd.reset()
+
+        for row in rows:
+            self.candles.upsert(row)
+            self.macd.update(row[0], row[4])
+        elapsed = time.monotonic() - start
+        logger.info(f"预热完成: {len(rows)} 根K线, 快照{'已' if restored else '未'}使用, 耗时 {elapsed:.3f}s")
+        return elapsed
+
+    def save_state(self, path=None):
+        """把MACD状态和状态机写入快照文件（先写临时文件再替换，避免写一半）"""
+        path = path or self.snapshot_path
+        snapshot = {
+            "symbol": self.symbol,
+            "candle_interval": self.candle_interval,
+            "state": self.state,
+            "macd": self.macd.state(),
+            "saved_at": int(time.time() * 1000),
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+        self._last_snapshot = time.monotonic()
+
+    def load_state(self, path=None):
+        """
+        读取快照恢复MACD状态；持仓状态以交易所为准，与快照不一致时只提示
+        :return: 是否恢复成功
+        """
+        path = path or self.snapshot_path
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+            if snapshot["symbol"] != self.symbol or snapshot["candle_interval"] != self.candle_interval:
+                return False
+            self.macd.load_state(snapshot["macd"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("快照不可用", error=e)
+            self.macd.reset()
+            return False
+        if snapshot["state"] != self.state:
+            logger.warning(f"⚠️ 快照状态 {snapshot['state']} 与当前持仓状态 {self.state} 不一致，以持仓为准")
+        return True
+
+    @property
+    def candles_df(self):
+        """滑动窗口的 DataFrame 拷贝（仅用于调试/兼容，热路径请用 self.candles 视图）"""
+        return self.candles.to_frame()
 
     def macd_signal(self):
-        """计算MACD并判断买卖信号"""
-        macd_df = Indicators.macd(self.candles_df)
-        if macd_df.empty or len(macd_df) < 2:
+        """根据增量MACD状态判断买卖信号"""
+        if self.macd.count < 2:
             return "hold"
-        # 取最近两根K线
-        last, prev = macd_df.iloc[-1], macd_df.iloc[-2]
+        # 取最近两根K线 (DIF, DEA, MACD)
+        last, prev = self.macd.last, self.macd.prev
         # 金叉开多：DIF由下向上穿越DEA
-        if prev["DIF"] < prev["DEA"] and last["DIF"] > last["DEA"]:
+        if prev[0] < prev[1] and last[0] > last[1]:
             return "long"
         # 死叉开空：DIF由上向下穿越DEA
-        elif prev["DIF"] > prev["DEA"] and last["DIF"] < last["DEA"]:
+        elif prev[0] > prev[1] and last[0] < last[1]:
             return "short"
         return "hold"
 
-    def order(self, side, tradeSide):
-        """开仓，side=buy开多, side=sell开空"""
-        available = self.adapter_api.get_available(self.productType, self.marginCoin)
-        if available < 10:
-            print("⚠️ 余额不足，无法下单")
-            return
-        price = self.adapter_api.get_last_price(self.symbol, self.productType)
-        size = self.adapter_api.get_open_size(self.symbol, self.productType, self.marginCoin, available/4, price, 20)
-        result = self.adapter_api.place_order(self.symbol, self.productType, "crossed", self.marginCoin, price, size, side, "market", "GTC", None, None, tradeSide)
-
-
-        
-        print(result)
+    def order(self, side, tradeSide, next_state):
+        """开仓，side=buy开多, side=sell开空；确认后切换到 next_state"""
+        # 先记下 pending 再提交：同步模式下回报会在 submit 返回前到达
+        self.pending = OrderIntent("open", self.symbol, self.productType, self.marginCoin, side=side,
+                                   tradeSide=tradeSide, fraction=self.fraction, leverage=self.leverage,
+                                   min_available=self.min_available, tag=next_state)
+        self.pending.tick_ns = self.event_bus.current_received_ns
+        self.order_manager.submit(self.pending)
 
     #无关价格一键平仓
     def close(self, side):
-        """平仓，side=long平多, side=short平空"""
-        result = self.adapter_api.close_position(self.symbol, self.productType, side)
-        print(result)
+        """平仓，side=long平多, side=short平空；确认后回到 toOrder"""
+        self.pending = OrderIntent("close", self.symbol, self.productType, self.marginCoin,
+                                   hold_side=side, tag="toOrder")
+        self.pending.tick_ns = self.event_bus.current_received_ns
+        self.order_manager.submit(self.pending)
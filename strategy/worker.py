@@ -0,0 +1,70 @@
+"""
+策略工作进程
+- 行情从共享内存环形缓冲读取（core.shm_ring），不自己建立 WS 行情连接
+- 每个进程使用自己的 APIAdapter（各自的账户凭证、连接池和限频）、风控和 OrderManager
+- 同一进程内可运行多个 Strategy（不同交易对/周期），进程之间互不影响，可以占满多个 CPU 核
+
+由 main_shm.py 以 multiprocessing.get_context("spawn").Process(target=run_worker, ...) 启动；
+不要用 fork：子进程会继承父进程 LogWriter 的运行标志却没有写线程，日志一直堆在队列里
+"""
+import os
+import signal
+from api.adapter_api import APIAdapter
+from core.event_bus import event_bus
+from core.shm_ring import ShmSubscriber
+from execution.order_manager import OrderManager
+from execution.risk_control import RiskEngine
+from strategy.strategy import Strategy
+from log import logger as log
+
+logger = log.get_logger("worker")
+
+
+def run_worker(ring_name, name, credentials, strategies, stop_event, log_dir="data/log"):
+    """
+    :param ring_name: 行情进程创建的共享内存名称
+    :param name: 工作进程名，用于日志文件名
+    :param credentials: {"api_key", "api_secret", "passphrase", "test", "base_url"}
+    :param strategies: [{"symbol", "productType", "marginCoin", "candle_interval", ...}]，其余键原样传给 Strategy
+    :param stop_event: 与 Process 同一 spawn 上下文创建的 Event，置位后退出
+    """
+    # Ctrl+C 由行情进程统一处理，工作进程只响应 stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    log.configure(path=os.path.join(log_dir, f"{name}.jsonl"),
+                  journal_path=os.path.join(log_dir, f"{name}.journal.jsonl"), console=False)
+
+    adapter_api = APIAdapter("bitget", credentials.get("test", True), credentials["api_key"],
+                             credentials["api_secret"], credentials["passphrase"],
+                             base_url=credentials.get("base_url"))
+    adapter_api.warmup()
+    product_types = {spec.get("productType", "USDT-FUTURES") for spec in strategies}
+    for product_type in product_types:
+        adapter_api.load_contracts(product_type)
+
+    risk = RiskEngine(event_bus=event_bus)
+    order_manager = OrderManager(adapter_api, event_bus, risk=risk)
+    running = []
+    for spec in strategies:
+        spec = dict(spec)
+        symbol = spec.pop("symbol")
+        interval = spec.pop("candle_interval")
+        risk.watch(symbol, f"candle{interval}")
+        strategy = Strategy(adapter_api, symbol, spec.pop("productType", "USDT-FUTURES"),
+                            spec.pop("marginCoin", "USDT"), candle_interval=interval, event_bus=event_bus,
+                            order_manager=order_manager, **spec)
+        strategy.warm_start()
+        running.append(strategy)
+
+    event_bus.start()
+    subscriber = ShmSubscriber(ring_name, event_bus).start()
+    logger.info(f"工作进程 {name} 已启动", pid=os.getpid(), strategies=[s.symbol for s in running])
+    try:
+        stop_event.wait()
+    finally:
+        subscriber.stop()
+        order_manager.stop()
+        event_bus.stop()
+        adapter_api.close()
+        logger.info(f"工作进程 {name} 已退出", read=subscriber.reader.read, lost=subscriber.reader.lost,
+                    overruns=subscriber.reader.overruns)
+        log.shutdown()
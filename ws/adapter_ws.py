@@ -1,12 +1,19 @@
-from bitget.bitget_ws import BitgetWebSocket
+from ws.bitget.bitget_ws import BitgetWebSocket
 
 class WebSocketAdapter:
     def __init__(self, exchange_name, ws_url, proxy_host=None, proxy_port=None, proxy_type=None,
-                 inst_type="SPOT", symbol="BTCUSDT", candle_interval="1m"):
+                 inst_type="SPOT", symbol="BTCUSDT", candle_interval="1m", subscriptions=None,
+                 api_key=None, api_secret=None, passphrase=None, recorder=None, rest_api=None,
+                 max_reconnects=None):
         self.exchange_name = exchange_name.lower()
 
         # 根据交易所选择具体 API 类
         if self.exchange_name == "bitget":
-            self.ws = BitgetWebSocket(ws_url, proxy_host, proxy_port, proxy_type, inst_type, symbol, candle_interval)
+            self.ws = BitgetWebSocket(ws_url, proxy_host, proxy_port, proxy_type, inst_type, symbol, candle_interval,
+                                      subscriptions, api_key, api_secret, passphrase, recorder,
+                                      rest_api=rest_api, max_reconnects=max_reconnects)
         else:
-            raise ValueError(f"暂不支持交易所: {exchange_name}")
\ No newline at end of file
+            raise ValueError(f"暂不支持交易所: {exchange_name}")
+
+    def close(self):
+        self.ws.close()
@@ -0,0 +1,33 @@
+import json
+
+# 可选的高速 JSON 后端：安装了 orjson 时使用，否则退回标准库
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    loads = json.loads
+    JSON_BACKEND = "json"
+
+# 控制帧：心跳回复为纯文本 "pong"，订阅/登录回执与错误以 {"event": 开头
+PONG = "pong"
+EVENT_PREFIX = '{"event"'
+
+
+def is_control(message):
+    """不解析 JSON，只用前缀判断是否为控制帧"""
+    return message == PONG or message.startswith(EVENT_PREFIX)
+
+
+def decode_candles(rows):
+    """
+    K线行一次性转成数值元组，下游不再重复字符串转浮点
+    WS 推送 8 列，REST 返回 7 列（此时 vol3 取 vol2，USDT 合约两者相同）
+    :return: [(startTime:int, open, high, low, close, vol1, vol2, vol3), ...]
+    """
+    out = []
+    for r in rows:
+        vol2 = float(r[6])
+        out.append((int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]),
+                    float(r[5]), vol2, float(r[7]) if len(r) > 7 else vol2))
+    return out
@@ -0,0 +1,80 @@
+from ws.bitget.bitget_ws import BitgetWebSocket
+from core.event_bus import event_bus as default_event_bus
+from log.logger import get_logger
+
+logger = get_logger("ws")
+
+# Bitget 单连接最多 1000 个频道，官方建议单连接不超过 50 个以保证稳定
+CHANNELS_PER_CONNECTION = 50
+
+
+class BitgetFeedManager:
+    """
+    多交易对、多频道行情管理
+    - 按单连接频道上限把订阅分批，交易对分片到少量连接上（同一交易对的频道在同一连接）
+    - 每条推送按 arg 直接查表路由到 market.<channel>.<instId> 主题，对应交易对的 handler 订阅该主题
+    """
+
+    def __init__(self, ws_url, proxy_host=None, proxy_port=None, proxy_type=None,
+                 inst_type="USDT-FUTURES", channels_per_connection=CHANNELS_PER_CONNECTION, max_connections=8,
+                 rest_api=None, event_bus=None):
+        """
+        rest_api: APIAdapter，传入时各连接重连后用 REST 补齐缺失的K线
+        event_bus: 推送投递的事件总线，默认全局 event_bus
+        """
+        self.ws_url = ws_url
+        self.proxy_host = proxy_host
+        self.proxy_port = proxy_port
+        self.proxy_type = proxy_type
+        self.inst_type = inst_type
+        self.channels_per_connection = channels_per_connection
+        self.max_connections = max_connections
+        self.rest_api = rest_api
+        self.event_bus = event_bus or default_event_bus
+        self._channels = {}   # instId -> [channel, ...]
+        self.connections = []
+
+    def add(self, symbol, *channels):
+        """添加订阅，例如 add("BTCUSDT", "candle15m", "ticker")"""
+        subscribed = self._channels.setdefault(symbol, [])
+        for channel in channels:
+            if channel not in subscribed:
+                subscribed.append(channel)
+
+    def subscribe(self, symbol, channel, handler):
+        """添加订阅并把 handler 注册到对应主题"""
+        self.add(symbol, channel)
+        self.event_bus.on(f"market.{channel}.{symbol}", handler)
+
+    def _shards(self):
+        """按交易对分片，每个分片的频道数不超过 channels_per_connection"""
+        shards = []
+        current = []
+        for symbol, channels in self._channels.items():
+            if len(channels) > self.channels_per_connection:
+                raise ValueError(f"{symbol} 的频道数超过单连接上限 {self.channels_per_connection}")
+            if len(current) + len(channels) > self.channels_per_connection:
+                shards.append(current)
+                current = []
+            current.extend((channel, symbol) for channel in channels)
+        if current:
+            shards.append(current)
+        if len(shards) > self.max_connections:
+            raise ValueError(f"需要 {len(shards)} 个连接，超过 max_connections={self.max_connections}")
+        return shards
+
+    def connect(self):
+        """建立全部连接，返回各连接的线程"""
+        threads = []
+        for subscriptions in self._shards():
+            ws = BitgetWebSocket(self.ws_url, self.proxy_host, self.proxy_port, self.proxy_type,
+                                 self.inst_type, subscriptions[0][1], subscriptions=subscriptions,
+                                 event_bus=self.event_bus, rest_api=self.rest_api)
+            self.connections.append(ws)
+            threads.append(ws.connect())
+        logger.info(f"📡 {len(self._channels)} 个交易对分布在 {len(self.connections)} 个连接上")
+        return threads
+
+    def close(self):
+        for ws in self.connections:
+            ws.close()
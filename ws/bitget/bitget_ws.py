@@ -1,17 +1,53 @@
 import json
+import random
 import threading
 import time
 from websocket import WebSocketApp
-from core.event_bus import event_bus
+from core.event_bus import event_bus as default_event_bus
+from api.bitget.bitget_api import sign
+from ws.bitget.bitget_decode import loads, is_control, decode_candles
+from dataProcess.kline_builder import interval_ms
+from core.latency import latency
+from log.logger import get_logger
+
+logger = get_logger("ws")
+
+
+# 单条 subscribe 消息最多携带的频道数（Bitget 限制单条请求 4096 字节）
+SUBSCRIBE_BATCH = 50
+
+# 私有频道（需要登录），推送发布到 private.<channel>
+PRIVATE_CHANNELS = {"account", "positions", "orders", "fill", "orders-algo"}
+
+# 私有连接默认订阅：全部合约的委托、持仓和账户
+PRIVATE_SUBSCRIPTIONS = [("orders", "default"), ("positions", "default"), ("account", "default")]
+
+# 重连退避：第 n 次等待 min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2^n) 内的随机时长（full jitter）
+RECONNECT_BASE_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+
+# 断线补K线单次最多拉取的根数（Bitget candles 接口上限）
+BACKFILL_LIMIT = 1000
 
 
 class BitgetWebSocket:
     def __init__(self, ws_url, proxy_host=None, proxy_port=None, proxy_type=None,
-                 inst_type="SPOT", symbol="BTCUSDT", candle_interval="1m"):
+                 inst_type="SPOT", symbol="BTCUSDT", candle_interval="1m", subscriptions=None,
+                 api_key=None, api_secret=None, passphrase=None, recorder=None, event_bus=None,
+                 rest_api=None, max_reconnects=None):
         """
         inst_type: "USDT-FUTURES" / "SPOT" / "MARGIN" ...
         symbol:    交易对，如 "BTCUSDT"
         candle_interval: K线周期，"1m","5m","1H"
+        subscriptions: [(channel, instId), ...]，一个连接订阅多个交易对/频道；
+                       不传时只订阅 symbol 的 candle{candle_interval}；
+                       私有连接不传时订阅 PRIVATE_SUBSCRIPTIONS
+        api_key/api_secret/passphrase: 传入时为私有连接（ws_url 用 .../v2/ws/private），
+                       连接后先登录，登录成功再订阅
+        recorder: ws.frame_journal.FrameRecorder，传入时录制每一帧原始数据，可用 FrameReplayer 回放
+        event_bus: 推送投递的事件总线，默认全局 event_bus
+        rest_api: APIAdapter，传入时重连后用 REST 补齐断线期间缺失的K线
+        max_reconnects: 连续重连失败的上限，None 表示一直重试
         """
         self.wsAPP = None
         self.ws_url = ws_url
@@ -19,85 +55,304 @@ class BitgetWebSocket:
         self.symbol = symbol
         self.candle_interval = candle_interval
         self.reconnect_attempts = 0
-        self.max_reconnects = 3
+        self.max_reconnects = max_reconnects
         self.stop_flag = False
+        self._stop_event = threading.Event()
+        self._thread = None
         self.proxy_host = proxy_host
         self.proxy_port = proxy_port
         self.proxy_type = proxy_type
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.passphrase = passphrase
+        self.private = api_key is not None
+        self.recorder = recorder
+        self.event_bus = event_bus or default_event_bus
+        self.rest_api = rest_api
+        if subscriptions is None:
+            subscriptions = PRIVATE_SUBSCRIPTIONS if self.private else [(f"candle{candle_interval}", symbol)]
+        self.subscriptions = list(subscriptions)
+        # 按推送中的 arg 路由：(channel, instId) -> (主题, 是否K线频道, 是否私有频道)
+        # 行情主题为 market.<channel>.<instId>，私有频道为 private.<channel>
+        self._routes = {}
+        for channel, inst_id in self.subscriptions:
+            if channel in PRIVATE_CHANNELS:
+                self._routes[(channel, inst_id)] = (f"private.{channel}", False, True)
+            else:
+                self._routes[(channel, inst_id)] = (f"market.{channel}.{inst_id}", channel.startswith("candle"), False)
+        self.candle_topic = f"market.candle{candle_interval}.{symbol}"
+
+        # 断线补K线：每个K线主题最后收到的 startTime；补齐期间该主题的实时推送先缓存，合并后一起发布
+        self._last_candle = {}
+        self._gates = {}
+        self._gate_lock = threading.Lock()
+        self._disconnected_at = None    # perf_counter_ns，None 表示当前没有断线
+        self.reconnects = 0
+        self.last_downtime = 0.0        # 最近一次断线到补齐完成的秒数
+        self.last_gap = 0               # 最近一次断线缺失的K线根数
+        self._gap = self._filled = 0
 
     def _on_open(self, ws):
-        print("✅ WebSocket 已连接")
+        logger.info("✅ WebSocket 已连接", url=self.ws_url)
         self.reconnect_attempts = 0
-        sub_msg = {
-            "op": "subscribe",
-            "args": [{
-                "instType": self.inst_type,
-                "channel": f"candle{self.candle_interval}",
-                "instId": self.symbol
-            }]
-        }
-        ws.send(json.dumps(sub_msg))
-        print("📡 已订阅:", sub_msg)
+        if self._disconnected_at is not None:
+            self._recover()
+        if self.private:
+            ws.send(json.dumps(self._login_message()))
+            return
+        self._subscribe(ws)
+
+    def _login_message(self):
+        """私有频道登录：sign = base64(HMAC_SHA256(secret, timestamp(秒) + "GET" + "/user/verify"))"""
+        timestamp = str(int(time.time()))
+        return {"op": "login", "args": [{
+            "apiKey": self.api_key,
+            "passphrase": self.passphrase,
+            "timestamp": timestamp,
+            "sign": sign(self.api_secret, timestamp + "GET" + "/user/verify"),
+        }]}
+
+    def _on_login(self, ws, message):
+        msg = loads(message)
+        if str(msg.get("code")) != "0":
+            logger.error("❌ WebSocket 登录失败", message=message)
+            self.event_bus.publish("system.ws_error", {"error": message})
+            return
+        logger.info("🔑 WebSocket 登录成功")
+        self._subscribe(ws)
+        # 账户状态在登录后（含每次重连）用 REST 对账
+        self.event_bus.publish("system.ws_logged_in", {"subscriptions": len(self.subscriptions)})
+
+    def _subscribe(self, ws):
+        args = []
+        for channel, inst_id in self.subscriptions:
+            arg = {"instType": self.inst_type, "channel": channel}
+            # account 频道按币种订阅，其它频道按 instId
+            arg["coin" if channel == "account" else "instId"] = inst_id
+            args.append(arg)
+        for i in range(0, len(args), SUBSCRIBE_BATCH):
+            sub_msg = {"op": "subscribe", "args": args[i:i + SUBSCRIBE_BATCH]}
+            ws.send(json.dumps(sub_msg))
+        logger.info(f"📡 已订阅 {len(args)} 个频道",
+                    channels=[a["channel"] + ":" + a.get("instId", a.get("coin")) for a in args[:5]])
         # 发出连接成功事件
-        import asyncio
-        asyncio.run(event_bus.emit("system.ws_connected", {"symbol": self.symbol}))
+        self.event_bus.publish("system.ws_connected", {"symbol": self.symbol, "subscriptions": len(args)})
 
     def _on_message(self, ws, message):
+        received = time.perf_counter_ns() if latency.enabled else 0
+        if self.recorder is not None:
+            self.recorder.write(message)
+        # pong / 订阅回执等控制帧只做前缀判断，不走 JSON 解析
+        if is_control(message):
+            if '"login"' in message:
+                self._on_login(ws, message)
+            elif '"error"' in message:
+                logger.warning("⚠️ WebSocket 错误回执", message=message)
+            return
         try:
-            msg = json.loads(message)
+            msg = loads(message)
         except Exception as e:
-            print("非 JSON 消息：", message, e)
+            logger.warning("非 JSON 消息", message=message, error=e)
             return
 
-        # 触发 candle 更新事件
-        if "data" in msg:
-            import asyncio
-            asyncio.run(event_bus.emit("market.candle_update", msg["data"]))
+        if "data" not in msg:
+            return
+        arg = msg.get("arg")
+        if arg is None:
+            return
+        route = self._routes.get((arg.get("channel"), arg.get("instId", arg.get("coin"))))
+        if route is None:
+            return
+        topic, is_candle, is_private = route
+        data = msg["data"]
+        if is_private:
+            # 私有推送不合并：每条委托/持仓变化都要处理；action 区分 snapshot / update
+            self.event_bus.publish(topic, data, msg.get("action"))
+            return
+        if is_candle:
+            # 在入口处一次性转成数值元组
+            data = decode_candles(data)
+            self._last_candle[topic] = data[-1][0]
+            if self._gates:
+                with self._gate_lock:
+                    gate = self._gates.get(topic)
+                    if gate is not None:
+                        gate["live"].extend(data)
+                        return
+        # 只含一根K线的推送按 startTime 合并：队列积压时同一根未收盘K线只保留最新值
+        coalesce_key = (topic, data[0][0]) if is_candle and len(data) == 1 else None
+        if received:
+            latency.record("ws.decode", time.perf_counter_ns() - received)
+        self.event_bus.publish(topic, data, coalesce_key=coalesce_key, received_ns=received)
 
     def _on_error(self, ws, error):
-        print("❌ WebSocket 错误:", error)
-        import asyncio
-        asyncio.run(event_bus.emit("system.ws_error", {"error": error}))
+        logger.error("❌ WebSocket 错误", error=error)
+        self.event_bus.publish("system.ws_error", {"error": error})
 
     def _on_close(self, ws, code, msg):
+        # 只记录，重连由 _run 的循环负责
         if self.stop_flag:
-            print("🛑 手动关闭 WebSocket，退出。")
+            logger.info("🛑 手动关闭 WebSocket，退出。")
+            return
+        if self._disconnected_at is None:
+            self._disconnected_at = time.perf_counter_ns()
+        logger.warning("⚠️ WebSocket 关闭", code=code, msg=msg)
+        self.event_bus.publish("system.ws_closed", {"code": code, "msg": msg})
+
+    # -----------------------------
+    # 断线补K线
+    # -----------------------------
+    def _recover(self):
+        """
+        重连后（订阅之前）调用：为每个K线主题打开缓存闸门，REST 补K线与订阅同时进行
+        没有 rest_api 或还没收到过K线时只统计断线时长
+        补K线未完成时再次断线重连：沿用已打开的闸门（保留已缓存的实时推送），再补一次，全部完成后才合并发布
+        """
+        self.reconnects += 1
+        pending = []
+        if self.rest_api is not None:
+            for (channel, inst_id), (topic, is_candle, _) in self._routes.items():
+                last = self._last_candle.get(topic)
+                if is_candle and last is not None:
+                    pending.append((topic, inst_id, channel[len("candle"):], last))
+        with self._gate_lock:
+            if not self._gates:
+                self._gap = self._filled = 0
+            for topic, _, _, last in pending:
+                gate = self._gates.get(topic)
+                if gate is None:
+                    # rest: REST 补到的K线；live: 闸门期间的实时推送；pending: 未完成的补K线次数；last: 断线前最后一根
+                    self._gates[topic] = {"rest": {}, "live": [], "pending": 1, "last": last}
+                else:
+                    gate["pending"] += 1
+            if not self._gates:
+                self._report_recovery()
+                return
+        for topic, inst_id, interval, last in pending:
+            self.rest_api.submit(self._backfill, topic, inst_id, interval, last)
+
+    def _backfill(self, topic, inst_id, interval, last):
+        """
+        拉取 [last, 现在] 的K线；该主题最后一次补K线完成时，与闸门期间缓存的实时推送按 startTime 合并后发布
+        """
+        rows = []
+        try:
+            resp = self.rest_api.get_kline(inst_id, self.inst_type, interval, startTime=last,
+                                           endTime=int(time.time() * 1000), limit=BACKFILL_LIMIT)
+            if resp.get("code") not in (None, "00000"):
+                raise RuntimeError(resp.get("msg"))
+            rows = decode_candles(resp.get("data") or [])
+        except Exception as e:
+            logger.error("❌ 断线补K线失败，缺口未补齐", topic=topic, error=e)
+
+        ms = interval_ms(interval)
+        with self._gate_lock:
+            gate = self._gates.get(topic)
+            if gate is None:
+                return
+            first = gate["last"]
+            gate["rest"].update((row[0], row) for row in rows if row[0] >= first)
+            gate["pending"] -= 1
+            if gate["pending"] > 0:
+                return
+            del self._gates[topic]
+            merged = gate["rest"]
+            live = gate["live"]
+            # 缺口：断线前最后一根之后、最后一根实时推送（没有时为当前K线）之前，实时推送中没有的K线数
+            live_times = {row[0] for row in live if row[0] > first}
+            end = max(live_times) if live_times else int(time.time() * 1000) // ms * ms
+            gap = max(0, int((end - first) // ms) - len(live_times))
+            filled = sum(1 for t in merged if first < t <= end and t not in live_times)
+            # 实时推送比 REST 结果新，同一 startTime 以实时推送为准
+            for row in live:
+                merged[row[0]] = row
+            if merged:
+                candles = [merged[t] for t in sorted(merged)]
+                self._last_candle[topic] = max(self._last_candle.get(topic, 0), candles[-1][0])
+                self.event_bus.publish(topic, candles)
+            remaining = len(self._gates)
+            self._gap += gap
+            self._filled += filled
+
+        if gap > filled:
+            logger.warning("⚠️ 断线缺口超过补齐范围", topic=topic, gap=gap, backfilled=filled)
+        logger.info(f"🧩 已补齐 {filled}/{gap} 根K线", topic=topic, buffered=len(live))
+        if remaining == 0:
+            self._report_recovery()
+
+    def _report_recovery(self):
+        """断线时长：第一次连接关闭到补K线全部合并完成（没有补K线时到重新连上）；缺口为各K线主题之和"""
+        disconnected_at = self._disconnected_at
+        if disconnected_at is None:
             return
+        gap, backfilled = self._gap, self._filled
+        downtime_ns = time.perf_counter_ns() - disconnected_at
+        self._disconnected_at = None
+        self.last_downtime = downtime_ns / 1e9
+        self.last_gap = gap
+        if latency.enabled:
+            latency.record("ws.downtime", downtime_ns)
+        logger.info(f"🔁 重连恢复，断线 {self.last_downtime:.3f}s", reconnects=self.reconnects, gap=gap,
+                    backfilled=backfilled)
+        self.event_bus.publish("system.ws_recovered", {"symbol": self.symbol, "downtime": self.last_downtime,
+                                                        "gap": gap, "backfilled": backfilled,
+                                                        "reconnects": self.reconnects})
 
-        print(f"⚠️ WebSocket 关闭: code={code}, msg={msg}")
-        import asyncio
-        asyncio.run(event_bus.emit("system.ws_closed", {"code": code, "msg": msg}))
+    # -----------------------------
+    # 连接与重连
+    # -----------------------------
+    def _backoff(self):
+        """指数退避 + full jitter，避免大量客户端同时重连"""
+        ceiling = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** self.reconnect_attempts)
+        return random.uniform(0, ceiling)
 
-        if self.reconnect_attempts < self.max_reconnects:
+    def _run(self):
+        """
+        唯一的连接线程：run_forever 返回（连接断开或连接失败）后退避重连，直到 close()
+        重连不再新开线程，也不在回调里 sleep
+        """
+        while not self.stop_flag:
+            self.wsAPP = WebSocketApp(
+                self.ws_url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close,
+            )
+            self.wsAPP.run_forever(
+                http_proxy_host=self.proxy_host,
+                http_proxy_port=self.proxy_port,
+                proxy_type=self.proxy_type,
+                ping_interval=30,
+                ping_timeout=10,
+            )
+            if self.stop_flag:
+                break
+            if self._disconnected_at is None:
+                # 连接失败时 on_close 不一定被调用
+                self._disconnected_at = time.perf_counter_ns()
+            if self.max_reconnects is not None and self.reconnect_attempts >= self.max_reconnects:
+                logger.error(f"❌ 连续 {self.reconnect_attempts} 次重连失败，停止重连。")
+                self.event_bus.publish("system.ws_error", {"error": "reconnect limit reached"})
+                break
+            delay = self._backoff()
             self.reconnect_attempts += 1
-            delay = 3 * self.reconnect_attempts
-            print(f"🔁 尝试第 {self.reconnect_attempts}/{self.max_reconnects} 次重连，{delay}s 后重试...")
-            time.sleep(delay)
-            self.connect()
-        else:
-            print("❌ 多次重连失败，程序退出。")
+            logger.info(f"🔁 {delay:.2f}s 后第 {self.reconnect_attempts} 次重连...")
+            if self._stop_event.wait(delay):
+                break
 
     def connect(self):
-        self.wsAPP = WebSocketApp(
-            self.ws_url,
-            on_open=self._on_open,
-            on_message=self._on_message,
-            on_error=self._on_error,
-            on_close=self._on_close,
-        )
-        thread = threading.Thread(
-            target=self.wsAPP.run_forever,
-            kwargs={
-                "http_proxy_host": self.proxy_host,
-                "http_proxy_port": self.proxy_port,
-                "proxy_type": self.proxy_type,
-                "ping_interval": 30,
-                "ping_timeout": 10
-            }
-        )
-        thread.start()
-        return thread
+        """启动连接线程并返回；线程在 close() 或达到重连上限后结束"""
+        self.stop_flag = False
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ws-public" if not self.private else "ws-private")
+        self._thread.start()
+        return self._thread
 
     def close(self):
         self.stop_flag = True
-        self.wsAPP.close()
+        self._stop_event.set()
+        if self.wsAPP is not None:
+            self.wsAPP.close()
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,234 @@
+"""
+WS 原始帧录制与回放
+- FrameRecorder：在 _on_message 入口把每一帧原始文本和接收时间放入队列（只做一次 deque.append），
+  后台线程写文件、按大小切分，磁盘 I/O 不占用 WS 读线程
+- FrameReplayer：mmap 读取录制文件，按录制时的节奏或尽快把帧送回同一个 _on_message
+  用于复现问题（同样的输入、同样的代码路径）和压测
+
+文件格式（小端）：
+    文件头  MAGIC (8 字节)
+    每帧    接收时间 time.time_ns() (int64) + 长度 (uint32) + UTF-8 原文
+
+查看录制文件：python -m ws.frame_journal data/ws
+"""
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+MAGIC = b"BGWSJ01\n"
+HEADER = struct.Struct("<qI")
+SUFFIX = ".wsj"
+
+
+class FrameRecorder:
+    """
+    :param directory: 录制目录，文件名为 <prefix>-<开始时间>-<序号>.wsj
+    :param max_bytes: 单个文件上限，超过后切换到新文件
+    :param maxsize: 队列上限，磁盘跟不上时新帧被丢弃（dropped 计数），不阻塞 WS 线程
+    :param flush_interval: 队列为空时写线程的轮询间隔（秒）
+    """
+
+    def __init__(self, directory, prefix="ws", max_bytes=256 * 1024 * 1024, buffer_size=1 << 20,
+                 maxsize=1000000, flush_interval=0.05):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.buffer_size = buffer_size
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+        self._queue = deque()
+        self._lock = threading.Lock()   # 只在写线程与 flush/close 之间使用
+        self._thread = None
+        self._running = False
+        self._stopped = False
+        self._file = None
+        self._size = 0
+        self._seq = 0
+        self.path = None
+        self.frames = 0
+        self.dropped = 0
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._seq += 1
+        name = f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{self._seq:04d}{SUFFIX}"
+        self.path = os.path.join(self.directory, name)
+        self._file = open(self.path, "wb", buffering=self.buffer_size)
+        self._file.write(MAGIC)
+        self._size = len(MAGIC)
+
+    def write(self, message, received_ns=None):
+        """追加一帧：只入队（GIL 下 deque.append 为原子操作，不加锁），编码和写盘在后台线程"""
+        queue = self._queue
+        if self._stopped or len(queue) >= self.maxsize:
+            self.dropped += 1
+            return False
+        queue.append((received_ns or time.time_ns(), message))
+        if not self._running:
+            self._start()
+        return True
+
+    def _start(self):
+        with self._lock:
+            if self._running or self._stopped:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="ws-recorder", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while self._running:
+            if not self._queue:
+                time.sleep(self.flush_interval)
+                continue
+            with self._lock:
+                self._drain()
+
+    def _drain(self):
+        """写出队列中的全部帧（需持有 _lock）"""
+        queue = self._queue
+        while queue:
+            received_ns, message = queue.popleft()
+            data = message.encode("utf-8") if isinstance(message, str) else message
+            if self._file is None or self._size >= self.max_bytes:
+                self._rotate()
+            self._file.write(HEADER.pack(received_ns, len(data)))
+            self._file.write(data)
+            self._size += HEADER.size + len(data)
+            self.frames += 1
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._open()
+
+    def flush(self):
+        """写出已入队的帧并刷到文件"""
+        with self._lock:
+            self._drain()
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        """写完已入队的帧后关闭文件；之后的 write() 直接丢弃"""
+        self._stopped = True
+        if self._running:
+            self._running = False
+            self._thread.join()
+        with self._lock:
+            self._drain()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _NullSocket:
+    """回放时代替 WebSocketApp：登录回执触发的订阅请求直接丢弃"""
+
+    def send(self, data):
+        pass
+
+
+def journal_files(path):
+    """单个文件、文件列表或目录（按文件名排序，即按录制时间）"""
+    if isinstance(path, (list, tuple)):
+        return list(path)
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(SUFFIX))
+    return [path]
+
+
+def read_frames(path):
+    """
+    逐帧读取录制文件（mmap，不整体读入内存）
+    :return: 生成器 (接收时间 ns, 原文 str)；文件末尾不完整的帧（写入中断）被忽略
+    """
+    for file in journal_files(path):
+        with open(file, "rb") as f:
+            if os.fstat(f.fileno()).st_size <= len(MAGIC):
+                continue
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[:len(MAGIC)] != MAGIC:
+                    raise ValueError(f"不是 WS 录制文件: {file}")
+                view = memoryview(mm)
+                try:
+                    offset = len(MAGIC)
+                    end = len(mm)
+                    while offset + HEADER.size <= end:
+                        received_ns, length = HEADER.unpack_from(mm, offset)
+                        offset += HEADER.size
+                        if offset + length > end:
+                            break
+                        yield received_ns, str(view[offset:offset + length], "utf-8")
+                        offset += length
+                finally:
+                    view.release()
+
+
+class FrameReplayer:
+    """
+    把录制的帧送回 BitgetWebSocket._on_message
+    :param speed: 1 为录制时的节奏，2 为两倍速；None 或 0 表示尽快
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+        self.frames = 0
+        self.max_lag_ms = 0.0   # 按节奏回放时，实际送出时间落后于计划的最大值
+
+    def run(self, on_message, limit=None):
+        """
+        :param on_message: BitgetWebSocket 实例或 _on_message(ws, message) 形式的回调
+        :return: {"frames", "elapsed", "frames_per_sec", "max_lag_ms"}
+        """
+        if hasattr(on_message, "_on_message"):
+            on_message = on_message._on_message
+        ws = _NullSocket()
+        paced = bool(self.speed)
+        first = None
+        start = time.perf_counter_ns()
+        for received_ns, message in read_frames(self.path):
+            if paced:
+                if first is None:
+                    first = received_ns
+                due = start + (received_ns - first) / self.speed
+                lag = time.perf_counter_ns() - due
+                if lag < 0:
+                    time.sleep(-lag / 1e9)
+                elif lag / 1e6 > self.max_lag_ms:
+                    self.max_lag_ms = lag / 1e6
+            on_message(ws, message)
+            self.frames += 1
+            if limit is not None and self.frames >= limit:
+                break
+        elapsed = (time.perf_counter_ns() - start) / 1e9
+        return {
+            "frames": self.frames,
+            "elapsed": elapsed,
+            "frames_per_sec": self.frames / elapsed if elapsed > 0 else 0.0,
+            "max_lag_ms": self.max_lag_ms,
+        }
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "data/ws"
+    for file in journal_files(path):
+        count = 0
+        first = last = None
+        size = 0
+        for received_ns, message in read_frames(file):
+            count += 1
+            size += len(message)
+            first = first or received_ns
+            last = received_ns
+        span = (last - first) / 1e9 if count else 0.0
+        print(f"{file}: {count} 帧, {size / 1024:.1f} KiB, 跨度 {span:.1f}s")
+
+
+if __name__ == "__main__":
+    main()